@@ -0,0 +1,162 @@
+"""Compare library-default thread pools against a CorePlan core budget.
+
+Runs N simulated cameras, one process each as in production, that decode a
+recorded clip (or synthetic 720p frames) and run YOLO on every frame. Each
+run uses the library defaults first and then the configured budget. Reports
+total throughput and inference latency percentiles for both runs.
+
+    python benchmarks/bench_core_budget.py --source clip.mp4 --cameras 2 --budget 4 --pin
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import queue
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from config import ConfigWatcher
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+
+def camera_worker(source, budget, pin_start, duration, imgsz, model_path, fps, results):
+    """One simulated camera: decode thread + inference loop, optionally under a CorePlan"""
+    import cv2
+    from resources import CorePlan
+
+    plan = CorePlan(budget, pin_start) if budget else None
+    if plan:
+        plan.apply_process()
+        plan.pin("inference")
+
+    from inference import LocalModel
+    model = LocalModel(model_path)
+
+    frames = queue.Queue(maxsize=2)
+    stop = threading.Event()
+    drops = [0]
+
+    def capture():
+        if plan:
+            plan.pin("capture")
+        cap = cv2.VideoCapture(source) if source else None
+        rng = np.random.default_rng(0)
+        synthetic = rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8)
+        interval = 1.0 / fps
+        next_t = time.monotonic()
+        while not stop.is_set():
+            if cap is not None:
+                ret, frame = cap.read()
+                if not ret:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+            else:
+                frame = synthetic.copy()
+            next_t += interval
+            time.sleep(max(0.0, next_t - time.monotonic()))
+            if frames.full():
+                try:
+                    frames.get_nowait()
+                    drops[0] += 1
+                except queue.Empty:
+                    pass
+            frames.put(frame)
+
+    threading.Thread(target=capture, daemon=True).start()
+
+    # Warm up outside the measured window
+    for _ in range(3):
+        model.predict(frames.get(), 0.5, imgsz)
+
+    latencies = []
+    start = time.monotonic()
+    while time.monotonic() - start < duration:
+        try:
+            frame = frames.get(timeout=1.0)
+        except queue.Empty:
+            continue
+        t0 = time.perf_counter()
+        model.predict(frame, 0.5, imgsz)
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.monotonic() - start
+    stop.set()
+    results.put({"frames": len(latencies), "drops": drops[0], "elapsed": elapsed, "latencies": latencies})
+
+
+def run_config(name, args, budget):
+    ctx = mp.get_context("spawn")
+    results = ctx.Queue()
+    procs = []
+    for cam in range(args.cameras):
+        pin_start = cam * args.budget if (budget and args.pin) else None
+        p = ctx.Process(target=camera_worker, args=(args.source, budget, pin_start, args.duration,
+                                                    args.imgsz, args.model, args.fps, results))
+        p.start()
+        procs.append(p)
+
+    runs = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    latencies = sorted(l for r in runs for l in r["latencies"])
+    summary = {
+        "config": name,
+        "cameras": args.cameras,
+        "fps_total": sum(r["frames"] / r["elapsed"] for r in runs),
+        "drop_rate": sum(r["drops"] for r in runs) / max(1, sum(r["frames"] + r["drops"] for r in runs)),
+        "p50_ms": 1000 * percentile(latencies, 0.50),
+        "p95_ms": 1000 * percentile(latencies, 0.95),
+        "p99_ms": 1000 * percentile(latencies, 0.99),
+    }
+    print(f"{name:<8} {summary['fps_total']:7.1f} fps  drop {100 * summary['drop_rate']:5.1f}%  "
+          f"p50 {summary['p50_ms']:6.1f}  p95 {summary['p95_ms']:6.1f}  p99 {summary['p99_ms']:6.1f} ms")
+    return summary
+
+
+def main():
+    settings = ConfigWatcher().settings
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default=None, help="video file to loop (default: synthetic 720p frames)")
+    parser.add_argument("--cameras", type=int, default=2)
+    parser.add_argument("--budget", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="cores per camera for the budgeted run")
+    parser.add_argument("--pin", action="store_true", help="also pin stages to per-camera core blocks")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--fps", type=float, default=15.0)
+    parser.add_argument("--imgsz", type=int, default=settings.imgsz)
+    parser.add_argument("--model", default=settings.resolved_model_path())
+    parser.add_argument("--json", help="write both summaries to this file")
+    args = parser.parse_args()
+
+    from resources import CorePlan
+    print(f"{args.cameras} camera(s), {os.cpu_count()} logical cores, budget "
+          f"{CorePlan(args.budget, 0 if args.pin else None).describe()}\n")
+
+    default = run_config("default", args, None)
+    budgeted = run_config("budget", args, args.budget)
+
+    gain = 100 * (budgeted["fps_total"] / default["fps_total"] - 1) if default["fps_total"] else float("nan")
+    print(f"\nthroughput {gain:+.1f}%, p95 {budgeted['p95_ms'] - default['p95_ms']:+.1f} ms, "
+          f"p99 {budgeted['p99_ms'] - default['p99_ms']:+.1f} ms")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"default": default, "budget": budgeted}, f, indent=2)
+
+    wins = budgeted["fps_total"] >= default["fps_total"] and budgeted["p95_ms"] <= default["p95_ms"]
+    print("Budget beats defaults" if wins else "Budget does NOT beat defaults on this host")
+    sys.exit(0 if wins else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Decode CPU per camera: single-stream versus dual-stream mode.
+
+Reads each stream for --seconds and reports process CPU per second of video:
+the main stream fully decoded (single-stream mode), the sub-stream fully
+decoded plus the main stream only demuxed (dual-stream mode). Works on live
+RTSP URLs or on recorded files of the two streams.
+
+    python benchmarks/bench_dual_stream.py --main rtsp://.../Streaming/Channels/101 --sub rtsp://.../Streaming/Channels/102
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+
+from config import ConfigWatcher
+from resources import cpu_seconds
+
+
+def measure(url, seconds, raw=False):
+    """(CPU seconds per second of video, frames, (w, h)) for reading url"""
+    cap = cv2.VideoCapture(url, cv2.CAP_FFMPEG)
+    if not cap.isOpened():
+        raise SystemExit(f"[ERROR] Cannot open {url}")
+    if raw and not cap.set(cv2.CAP_PROP_FORMAT, -1):
+        raise SystemExit("[ERROR] This OpenCV build cannot return undecoded packets")
+    size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    fps = fps if 0 < fps <= 120 else 25.0
+
+    frames = 0
+    cpu0, start = cpu_seconds(), time.monotonic()
+    while time.monotonic() - start < seconds:
+        if not cap.grab():
+            break
+        cap.retrieve()
+        frames += 1
+    cpu = cpu_seconds() - cpu0
+    cap.release()
+    video_seconds = frames / fps
+    return (cpu / video_seconds if video_seconds else float("nan")), frames, size
+
+
+def main():
+    settings = ConfigWatcher().settings
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--main", default=settings.rtsp_url, help="main stream (default: rtsp_url)")
+    parser.add_argument("--sub", default=settings.substream_url, help="sub-stream (default: substream_url)")
+    parser.add_argument("--seconds", type=float, default=20.0)
+    args = parser.parse_args()
+    if not args.main or not args.sub:
+        parser.error("--main and --sub are required when settings.json has no rtsp_url/substream_url")
+
+    # Count the decoder's own threads the same way as production
+    cv2.setNumThreads(1)
+    main_decode, n_main, main_size = measure(args.main, args.seconds)
+    sub_decode, n_sub, sub_size = measure(args.sub, args.seconds)
+    main_demux, n_raw, _ = measure(args.main, args.seconds, raw=True)
+
+    single = main_decode
+    dual = sub_decode + main_demux
+    print(f"main decode  {main_size[0]}x{main_size[1]}  {n_main:5d} frames  {100 * main_decode:6.1f}% CPU")
+    print(f"sub decode   {sub_size[0]}x{sub_size[1]}  {n_sub:5d} frames  {100 * sub_decode:6.1f}% CPU")
+    print(f"main demux   (no decode)  {n_raw:5d} packets {100 * main_demux:6.1f}% CPU")
+    print(f"\nsingle-stream {100 * single:.1f}% vs dual-stream {100 * dual:.1f}% of one core per camera "
+          f"({single / dual:.1f}x less)" if dual else "")
+
+
+if __name__ == "__main__":
+    main()
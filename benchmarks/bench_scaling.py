@@ -0,0 +1,342 @@
+"""Find how many cameras one host can guard: sweep simulated cameras until the latency budget breaks.
+
+Each simulated camera is its own process, as in production. It loops a
+recorded clip (or synthetic frames) at a fixed fps and resolution through
+the full HandDetector pipeline: the capture thread, the frame queue,
+frame_skip, inference, zones and the zone state machine. Machine stops are
+counted, not actuated, and intrusion snapshots go to a temporary folder.
+
+For N = --start, --start + --step, ... all cameras run together for
+--duration seconds after warm-up. For each N it reports sustained fps,
+frame-drop rate, inference and detection latency percentiles, and CPU and
+RSS per camera. Detection latency is p95 queue age + p95 inference, the
+same measure as the degradation SLO. N passes when detection latency stays
+within --latency-budget and drops within --max-drop. The sweep stops at the
+first failing N and reports the largest N that passed.
+
+    python benchmarks/bench_scaling.py --source clips/press1.mp4 --fps 15 --size 1280x720 --max-cameras 8
+    python benchmarks/bench_scaling.py --source clips/ --budget 2 --pin --json diagnostics/scaling.json
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import platform
+import queue
+import sys
+import tempfile
+import time
+from dataclasses import replace
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+
+from config import ConfigWatcher
+from detector import HandDetector
+
+CLIP_EXTENSIONS = (".mp4", ".avi", ".mkv", ".mov")
+# Used when the configured camera has no zones of its own (normalized, as in settings.json)
+DEFAULT_ZONES = [
+    {"severity": "yellow", "points": [[0.25, 0.15], [0.75, 0.15], [0.75, 0.30], [0.25, 0.30]]},
+    {"severity": "red", "points": [[0.25, 0.30], [0.75, 0.30], [0.75, 0.75], [0.25, 0.75]]},
+]
+WARMUP_FRAMES = 5
+READY_TIMEOUT = 300.0  # model load + warm-up for the slowest camera
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+
+class DryRunDetector(HandDetector):
+    """HandDetector that counts machine stops instead of launching master.py"""
+    stops = 0
+
+    def actuate(self, reason):
+        self.stops += 1
+
+
+class LoopedClip:
+    """Camera stand-in with the cv2.VideoCapture read()/release() interface.
+
+    Delivers frames on a fixed fps schedule whether or not the reader keeps
+    up, like a real camera: when a read comes more than a frame interval
+    late, the frames in between count as `late` (lost at the source) and the
+    schedule restarts from now. A clip is decoded on every read and looped at
+    its end; frames are resized only when the clip is not already at `size`.
+    """
+
+    def __init__(self, path, fps, size, start_frame=0):
+        self.interval = 1.0 / fps
+        self.size = size
+        self.late = 0
+        self.cap = None
+        self.synthetic = None
+        if path:
+            self.cap = cv2.VideoCapture(path)
+            if not self.cap.isOpened():
+                raise OSError(f"cannot open {path}")
+            frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT)) or 1
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame % frames)
+        else:
+            rng = np.random.default_rng(start_frame)
+            self.synthetic = rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8)
+        self.next_t = time.monotonic()
+
+    def read(self):
+        now = time.monotonic()
+        if now < self.next_t:
+            time.sleep(self.next_t - now)
+        elif now - self.next_t >= self.interval:
+            self.late += int((now - self.next_t) / self.interval)
+            self.next_t = now
+        self.next_t += self.interval
+
+        if self.cap is None:
+            return True, self.synthetic.copy()
+        ret, frame = self.cap.read()
+        if not ret:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+            if not ret:
+                return False, None
+        if (frame.shape[1], frame.shape[0]) != self.size:
+            frame = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        return True, frame
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+
+
+def camera_worker(cam, source, args, settings, ready, results):
+    """One simulated camera: full HandDetector pipeline on a LoopedClip"""
+    try:
+        from fast_path import hand_classes
+        from resources import cpu_seconds, rss_bytes
+
+        detector = DryRunDetector(settings)
+        detector.intrusion_save_path = tempfile.mkdtemp(prefix=f"loadtest{cam}_")
+        if detector.yolo_model is None:
+            raise RuntimeError(f"model {settings.model_path} did not load")
+        detector.detection_enabled = True
+        if not len(hand_classes(detector.yolo_model.names)):
+            print(f"[WARNING] camera {cam}: model has no hand/glove class; zone logic never runs")
+
+        detector.start_capture(LoopedClip(source, args.fps, args.size, start_frame=37 * cam))
+        metrics = detector.metrics
+        for _ in range(WARMUP_FRAMES * settings.frame_skip):
+            frame = detector.get_frame()
+            if frame is not None:
+                detector.process_frame(frame)
+
+        ready.wait(READY_TIMEOUT)  # every camera loaded and warm: measure them together
+        counters = dict(metrics.counters)
+        late = detector.camera.late
+        cpu0, start = cpu_seconds(), time.monotonic()
+        rss_peak = rss_bytes() or 0
+        next_rss = start + 1.0
+        inference, queue_age = [], []
+        while True:
+            now = time.monotonic()
+            if now - start >= args.duration:
+                break
+            if now >= next_rss:
+                rss_peak = max(rss_peak, rss_bytes() or 0)
+                next_rss = now + 1.0
+            frame = detector.get_frame()
+            if frame is None:
+                continue
+            age = metrics.latest("queue")
+            inferred = metrics.count("frames_inferred")
+            detector.process_frame(frame)
+            if metrics.count("frames_inferred") != inferred:
+                inference.append(metrics.latest("inference"))
+                queue_age.append(age)
+        elapsed = time.monotonic() - start
+        cpu = cpu_seconds() - cpu0
+        detector.stop_capture()
+
+        results.put({
+            "camera": cam,
+            "elapsed": elapsed,
+            "captured": metrics.count("frames_captured") - counters["frames_captured"],
+            "dropped": metrics.count("frames_dropped") - counters["frames_dropped"],
+            "late": detector.camera.late - late,
+            "inferred": len(inference),
+            "inference": inference,
+            "queue": queue_age,
+            "cpu_percent": 100 * cpu / elapsed,
+            "rss_mb": rss_peak / 1e6,
+            "stops": detector.stops,
+        })
+    except Exception as e:
+        ready.abort()
+        results.put({"camera": cam, "error": f"{type(e).__name__}: {e}"})
+
+
+def camera_settings(settings, args, cam):
+    zones = settings.camera_zones() or DEFAULT_ZONES
+    pin_start = cam * args.budget if (args.budget and args.pin) else None
+    return replace(
+        settings,
+        model_path=args.model or settings.model_path,
+        camera_id=f"loadtest{cam}",
+        zones={f"loadtest{cam}": zones},
+        cpu_budget=args.budget,
+        cpu_pin_start=pin_start,
+        mine_hard_examples=False,
+        latency_slo_ms=settings.latency_slo_ms if args.degrade else 0,
+    )
+
+
+def run_n(n, sources, args, settings):
+    ctx = mp.get_context("spawn")
+    ready = ctx.Barrier(n)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=camera_worker,
+                         args=(cam, sources[cam % len(sources)], args, camera_settings(settings, args, cam),
+                               ready, results),
+                         daemon=True)
+             for cam in range(n)]
+    for p in procs:
+        p.start()
+
+    runs = []
+    deadline = time.monotonic() + READY_TIMEOUT + args.duration + 60
+    while len(runs) < n:
+        try:
+            runs.append(results.get(timeout=max(1.0, deadline - time.monotonic())))
+        except queue.Empty:
+            runs.append({"camera": None, "error": "timed out"})
+            break
+    for p in procs:
+        p.join(timeout=10)
+        if p.is_alive():
+            p.terminate()
+
+    errors = [r["error"] for r in runs if "error" in r]
+    if errors:
+        return {"cameras": n, "pass": False, "errors": errors}
+
+    inference = sorted(v for r in runs for v in r["inference"])
+    queue_age = sorted(v for r in runs for v in r["queue"])
+    produced = sum(r["captured"] + r["late"] for r in runs)
+    lost = sum(r["dropped"] + r["late"] for r in runs)
+    summary = {
+        "cameras": n,
+        "fps_per_camera": sum(r["captured"] / r["elapsed"] for r in runs) / n,
+        "min_fps": min(r["captured"] / r["elapsed"] for r in runs),
+        "inferred_fps_per_camera": sum(r["inferred"] / r["elapsed"] for r in runs) / n,
+        "drop_rate": lost / produced if produced else 1.0,
+        "inference_ms": {f"p{int(q * 100)}": 1000 * percentile(inference, q) for q in (0.5, 0.95, 0.99)},
+        "queue_ms": {f"p{int(q * 100)}": 1000 * percentile(queue_age, q) for q in (0.5, 0.95, 0.99)},
+        "cpu_percent_per_camera": sum(r["cpu_percent"] for r in runs) / n,
+        "rss_mb_per_camera": sum(r["rss_mb"] for r in runs) / n,
+        "stops": sum(r["stops"] for r in runs),
+    }
+    summary["detection_p95_ms"] = summary["queue_ms"]["p95"] + summary["inference_ms"]["p95"]
+    summary["pass"] = bool(inference) and summary["detection_p95_ms"] <= args.latency_budget \
+        and summary["drop_rate"] <= args.max_drop
+    return summary
+
+
+def print_row(s):
+    if "errors" in s:
+        print(f"{s['cameras']:>3}  FAIL  " + "; ".join(s["errors"]))
+        return
+    print(f"{s['cameras']:>3}  {'PASS' if s['pass'] else 'FAIL'}  {s['fps_per_camera']:6.1f} fps "
+          f"(min {s['min_fps']:5.1f}, infer {s['inferred_fps_per_camera']:5.1f})  drop {100 * s['drop_rate']:5.1f}%  "
+          f"infer p50 {s['inference_ms']['p50']:6.1f} p95 {s['inference_ms']['p95']:6.1f} ms  "
+          f"detect p95 {s['detection_p95_ms']:6.1f} ms  CPU {s['cpu_percent_per_camera']:5.0f}%  "
+          f"RSS {s['rss_mb_per_camera']:6.0f} MB")
+
+
+def list_sources(paths):
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            sources.extend(sorted(os.path.join(path, name) for name in os.listdir(path)
+                                  if name.lower().endswith(CLIP_EXTENSIONS)))
+        else:
+            sources.append(path)
+    return sources or [None]
+
+
+def parse_size(text):
+    w, h = text.lower().split("x")
+    return int(w), int(h)
+
+
+def main():
+    settings = ConfigWatcher().settings
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", nargs="*", default=[], help="clips or folders of clips (default: synthetic frames)")
+    parser.add_argument("--fps", type=float, default=15.0, help="frame rate of each simulated camera")
+    parser.add_argument("--size", type=parse_size, default=(1280, 720), help="camera resolution, WxH")
+    parser.add_argument("--start", type=int, default=1)
+    parser.add_argument("--step", type=int, default=1)
+    parser.add_argument("--max-cameras", type=int, default=max(1, os.cpu_count() or 1))
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds per N")
+    parser.add_argument("--latency-budget", type=float, default=settings.latency_slo_ms or 250.0,
+                        help="p95 queue age + p95 inference, ms")
+    parser.add_argument("--max-drop", type=float, default=0.05, help="allowed fraction of frames lost")
+    parser.add_argument("--budget", type=int, default=settings.cpu_budget, help="CorePlan cores per camera (0: defaults)")
+    parser.add_argument("--pin", action="store_true", help="pin each camera to its own core block")
+    parser.add_argument("--degrade", action="store_true",
+                        help="keep the degradation controller on (default: measure at full quality)")
+    parser.add_argument("--model", help="weights (default: configured model)")
+    parser.add_argument("--json", help="write the sweep to this file")
+    args = parser.parse_args()
+    args.size = tuple(args.size)
+    if args.start < 1 or args.step < 1:
+        parser.error("--start and --step must be >= 1")
+    if args.max_cameras < args.start:
+        parser.error(f"--max-cameras ({args.max_cameras}) must be >= --start ({args.start})")
+    if args.fps <= 0 or args.duration <= 0:
+        parser.error("--fps and --duration must be > 0")
+
+    sources = list_sources(args.source)
+    print(f"{os.cpu_count()} logical cores | {args.size[0]}x{args.size[1]} @ {args.fps:g} fps | "
+          f"frame_skip {settings.frame_skip} | budget {args.latency_budget:g} ms p95, drop <= {100 * args.max_drop:g}% | "
+          f"source: {', '.join(s for s in sources if s) or 'synthetic'}\n")
+
+    sweep = []
+    for n in range(args.start, args.max_cameras + 1, args.step):
+        summary = run_n(n, sources, args, settings)
+        print_row(summary)
+        sweep.append(summary)
+        if not summary["pass"]:
+            break
+
+    passed = [s["cameras"] for s in sweep if s["pass"]]
+    best = max(passed) if passed else 0
+    if not sweep:
+        print("\nNo camera counts measured")
+    elif not sweep[-1]["pass"]:
+        print(f"\nMax cameras within budget: {best}")
+    else:
+        print(f"\nMax cameras within budget: >= {best} (sweep limit reached; raise --max-cameras)")
+
+    if args.json:
+        os.makedirs(os.path.dirname(args.json) or ".", exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "time": datetime.now().isoformat(timespec="seconds"),
+                "host": platform.node(),
+                "cpu_count": os.cpu_count(),
+                "args": {k: v for k, v in vars(args).items() if k != "json"},
+                "frame_skip": settings.frame_skip,
+                "max_cameras": best,
+                "sweep": sweep,
+            }, f, indent=2)
+    sys.exit(0 if best else 1)
+
+
+if __name__ == "__main__":
+    main()
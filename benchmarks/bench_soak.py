@@ -0,0 +1,269 @@
+"""Long-run soak test: memory and latency drift of the full pipeline.
+
+Runs the GUI (capture, detection, overlay and the Tk render path) or, with
+--headless, the same pipeline without Tk, against a looping recorded source
+for hours. Machine stops are counted, not actuated, and intrusion snapshots
+go to a temporary folder.
+
+Every --interval seconds it samples RSS, tracemalloc's traced memory, the
+Python object count and frame latency percentiles. After --warmup, each
+series gets a least-squares slope per hour; the run fails (exit 1) when
+RSS, traced memory, objects or p95 frame latency grows faster than its limit.
+The report lists the allocation sites and object types that grew most
+since the end of warm-up, and is written to diagnostics/soak_<ts>.json.
+
+    python benchmarks/bench_soak.py --source clips/press1.mp4 --hours 8
+    python benchmarks/bench_soak.py --source clips/ --hours 0.5 --interval 10 --warmup 120 --headless
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from dataclasses import replace
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_scaling import DEFAULT_ZONES, DryRunDetector, LoopedClip, list_sources, parse_size
+from config import ConfigWatcher
+from resources import rss_bytes
+
+REPORT_DIR = "diagnostics"
+TOP_SITES = 15
+
+
+def slope_per_hour(samples, key):
+    """Least-squares slope of samples[key] against elapsed hours"""
+    points = [(s["hours"], s[key]) for s in samples if s.get(key) is not None]
+    if len(points) < 3:
+        return None
+    n = len(points)
+    mx = sum(x for x, _ in points) / n
+    my = sum(y for _, y in points) / n
+    var = sum((x - mx) ** 2 for x, _ in points)
+    if not var:
+        return None
+    return sum((x - mx) * (y - my) for x, y in points) / var
+
+
+def object_types():
+    return Counter(type(o).__name__ for o in gc.get_objects())
+
+
+class SoakMonitor:
+    """Periodic samples plus tracemalloc/object baselines taken at the end of warm-up"""
+
+    def __init__(self, metrics, args):
+        self.metrics = metrics
+        self.args = args
+        self.start = time.monotonic()
+        self.next_sample = self.start + args.interval
+        self.samples = []
+        self.baseline = None
+        self.baseline_types = None
+        self.frames_at_last = 0
+
+    def due(self):
+        return time.monotonic() >= self.next_sample
+
+    def finished(self):
+        return time.monotonic() - self.start >= self.args.hours * 3600
+
+    def sample(self):
+        now = time.monotonic()
+        self.next_sample = now + self.args.interval
+        elapsed = now - self.start
+        frames = self.metrics.latency_count["frame"]
+        latency = self.metrics.percentiles("frame", (0.5, 0.95))
+        sample = {
+            "hours": elapsed / 3600,
+            "rss_mb": (rss_bytes() or 0) / 1e6,
+            "traced_mb": tracemalloc.get_traced_memory()[0] / 1e6 if tracemalloc.is_tracing() else None,
+            "objects": len(gc.get_objects()),
+            "frame_p50_ms": 1000 * latency[0.5] if latency[0.5] is not None else None,
+            "frame_p95_ms": 1000 * latency[0.95] if latency[0.95] is not None else None,
+            "fps": (frames - self.frames_at_last) / self.args.interval,
+            "dropped": self.metrics.count("frames_dropped"),
+        }
+        self.frames_at_last = frames
+        if elapsed < self.args.warmup:
+            sample["warmup"] = True
+        elif self.baseline_types is None:
+            self.baseline_types = object_types()
+            self.baseline = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+        self.samples.append(sample)
+
+        def fmt(value, spec):
+            return "-" if value is None else format(value, spec)
+
+        print(f"[SOAK] {elapsed / 60:7.1f} min  RSS {sample['rss_mb']:7.1f} MB  "
+              f"traced {fmt(sample['traced_mb'], '7.1f')} MB  objects {sample['objects']:8d}  "
+              f"frame p50 {fmt(sample['frame_p50_ms'], '6.1f')} p95 {fmt(sample['frame_p95_ms'], '6.1f')} ms  "
+              f"{sample['fps']:5.1f} fps" + ("  (warm-up)" if sample.get("warmup") else ""))
+
+    def report(self):
+        measured = [s for s in self.samples if not s.get("warmup")]
+        limits = {
+            "rss_mb": self.args.max_rss_slope,
+            "traced_mb": self.args.max_traced_slope,
+            "objects": self.args.max_object_slope,
+            "frame_p95_ms": self.args.max_latency_slope,
+        }
+        checks = []
+        for key, limit in limits.items():
+            slope = slope_per_hour(measured, key)
+            checks.append({"series": key, "slope_per_hour": slope, "limit": limit,
+                           "pass": slope is None or slope <= limit})
+
+        growth = []
+        if self.baseline is not None:
+            for stat in tracemalloc.take_snapshot().compare_to(self.baseline, "lineno")[:self.args.top]:
+                frame = stat.traceback[0]
+                growth.append({"site": f"{frame.filename}:{frame.lineno}", "size_diff_kb": stat.size_diff / 1024,
+                               "count_diff": stat.count_diff})
+        types = []
+        if self.baseline_types is not None:
+            diff = object_types()
+            diff.subtract(self.baseline_types)
+            types = [{"type": name, "count_diff": n} for name, n in diff.most_common(self.args.top) if n > 0]
+
+        return {
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "args": {k: v for k, v in vars(self.args).items()},
+            "samples": self.samples,
+            "checks": checks,
+            "allocation_growth": growth,
+            "object_growth": types,
+            "pass": bool(measured) and all(c["pass"] for c in checks),
+        }
+
+
+def print_report(report):
+    print("\n[SOAK] Top allocation growth since warm-up:")
+    for g in report["allocation_growth"]:
+        print(f"  {g['size_diff_kb']:+10.1f} KB  {g['count_diff']:+8d} blocks  {g['site']}")
+    print("[SOAK] Top object type growth:")
+    for t in report["object_growth"]:
+        print(f"  {t['count_diff']:+8d}  {t['type']}")
+    print()
+    for c in report["checks"]:
+        slope = "n/a" if c["slope_per_hour"] is None else f"{c['slope_per_hour']:+.2f}/h"
+        print(f"  [{'PASS' if c['pass'] else 'FAIL'}] {c['series']:<14} {slope:>12}  (limit {c['limit']:+g}/h)")
+    if not any(not s.get("warmup") for s in report["samples"]):
+        print("  [FAIL] no samples after warm-up; run longer than --warmup")
+    print(f"\n[SOAK] {'PASS' if report['pass'] else 'FAIL'}")
+
+
+def soak_detector(settings):
+    """DryRunDetector without mining, on this camera's zones or default ones, saving to a temporary folder"""
+    zones = settings.camera_zones() or DEFAULT_ZONES
+    detector = DryRunDetector(replace(settings, camera_id="soak", zones={"soak": zones}, mine_hard_examples=False))
+    detector.intrusion_save_path = tempfile.mkdtemp(prefix="soak_")
+    return detector
+
+
+def run_headless(args, settings, source):
+    """Capture, detection and overlay without Tk"""
+    detector = soak_detector(settings)
+    detector.detection_enabled = True
+    detector.start_capture(source)
+    monitor = SoakMonitor(detector.metrics, args)
+    try:
+        while not monitor.finished():
+            frame = detector.get_frame()
+            if frame is not None:
+                t0 = time.perf_counter()
+                frame, _ = detector.process_frame(frame)
+                detector.draw_ui_overlay(frame)
+                detector.metrics.observe("frame", time.perf_counter() - t0)
+            if monitor.due():
+                monitor.sample()
+    except KeyboardInterrupt:
+        print("[SOAK] Interrupted; reporting what was sampled")
+    detector.stop_capture()
+    return monitor.report()
+
+
+def run_gui(args, settings, source):
+    """The full GUI, fed from the looping source; sampled from the Tk thread"""
+    from new1_laptop import MachineSafetyGUI
+
+    class SoakGUI(MachineSafetyGUI):
+        detector_class = staticmethod(soak_detector)
+
+        def start_camera(self):
+            self.detector.start_capture(source)
+            self.is_camera_active = True
+            self.monitor = SoakMonitor(self.detector.metrics, args)
+            self.result = None
+            self.update_feed()
+            self.log_message("Soak test: looping recorded source.")
+            self.after(1000, self.soak_tick)
+
+        def soak_tick(self):
+            if self.monitor.due():
+                self.monitor.sample()
+            if self.monitor.finished():
+                self.result = self.monitor.report()
+                self.quit()
+                return
+            self.after(1000, self.soak_tick)
+
+    app = SoakGUI()
+    try:
+        app.mainloop()
+    except KeyboardInterrupt:
+        pass
+    report = app.result or app.monitor.report()
+    app.detector.stop_capture()
+    app.destroy()
+    return report
+
+
+def main():
+    settings = ConfigWatcher().settings
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", nargs="*", default=[], help="clip or folder of clips (default: synthetic frames)")
+    parser.add_argument("--fps", type=float, default=15.0)
+    parser.add_argument("--size", type=parse_size, default=(1280, 720), help="frame size, WxH")
+    parser.add_argument("--hours", type=float, default=4.0)
+    parser.add_argument("--interval", type=float, default=60.0, help="seconds between samples")
+    parser.add_argument("--warmup", type=float, default=600.0, help="seconds excluded from slopes and baselines")
+    parser.add_argument("--headless", action="store_true", help="skip the Tk render path")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="skip allocation tracing (lower overhead)")
+    parser.add_argument("--trace-depth", type=int, default=1, help="stack frames kept per allocation")
+    parser.add_argument("--top", type=int, default=TOP_SITES, help="growth sites and types to report")
+    parser.add_argument("--max-rss-slope", type=float, default=5.0, help="MB per hour")
+    parser.add_argument("--max-traced-slope", type=float, default=2.0, help="MB per hour")
+    parser.add_argument("--max-object-slope", type=float, default=2000.0, help="objects per hour")
+    parser.add_argument("--max-latency-slope", type=float, default=2.0, help="p95 frame latency, ms per hour")
+    args = parser.parse_args()
+    args.size = tuple(args.size)
+
+    sources = [s for s in list_sources(args.source) if s]
+    if len(sources) > 1:
+        print(f"[SOAK] Using {sources[0]}; the soak loops one clip")
+    source = LoopedClip(sources[0] if sources else None, args.fps, args.size)
+    if not args.no_tracemalloc:
+        tracemalloc.start(args.trace_depth)
+
+    print(f"[SOAK] {args.hours:g} h, sample every {args.interval:g} s, warm-up {args.warmup:g} s, "
+          f"{'headless' if args.headless else 'GUI'}, source {sources[0] if sources else 'synthetic'}")
+    report = run_headless(args, settings, source) if args.headless else run_gui(args, settings, source)
+    print_report(report)
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    path = os.path.join(REPORT_DIR, f"soak_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"[SOAK] Report written to {path}")
+    sys.exit(0 if report["pass"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""Per-stage micro-benchmarks on synthetic frames and zones (no camera, no display).
+
+Times the hot per-frame functions at 480p, 720p and 1080p:
+
+    point_in_poly   zones.point_in_poly_fast on one compiled polygon
+    hand_zone       HandDetector.get_hand_zone (all zones, hysteresis margin)
+    overlay         HandDetector.draw_ui_overlay
+    fit_frame       detector.fit_frame, the GUI's aspect-fit resize (to 1280x720)
+    letterbox       fast_path.Letterbox.fill into the preallocated input
+    postprocess     fast_path decode + NMS of a synthetic raw YOLOv8 output
+    forward         YOLO forward pass, stock and fast path (only with --model weights)
+
+Results are per-call microseconds (median, p95, mean). --save writes them as
+a JSON baseline. --compare flags every stage whose median got slower than
+the baseline by more than --threshold, and exits 1 if any did.
+
+    python benchmarks/bench_stages.py --save benchmarks/baselines/$(hostname).json
+    python benchmarks/bench_stages.py --compare benchmarks/baselines/$(hostname).json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+
+from config import Settings
+from detector import HandDetector, fit_frame
+from fast_path import FastPath, Letterbox
+from zones import point_in_poly_fast
+
+RESOLUTIONS = {"480p": (854, 480), "720p": (1280, 720), "1080p": (1920, 1080)}
+ZONES = [
+    {"severity": "yellow", "points": [[0.15, 0.14], [0.47, 0.14], [0.47, 0.22], [0.15, 0.22]]},
+    {"severity": "red", "points": [[0.15, 0.22], [0.47, 0.22], [0.52, 0.40], [0.47, 0.56], [0.30, 0.60],
+                                   [0.15, 0.56], [0.12, 0.40]]},
+]
+NAMES = {0: "hand", 1: "glove", 2: "background"}
+DISPLAY = (1280, 720)
+TARGET_SECONDS = 0.3  # per stage and resolution
+
+
+def measure(fn, target=TARGET_SECONDS, samples=50):
+    """Per-call seconds: `samples` timings of enough calls to fill target seconds"""
+    fn()  # warm up
+    t0 = time.perf_counter()
+    fn()
+    once = max(time.perf_counter() - t0, 1e-7)
+    number = max(1, int(target / samples / once))
+    times = []
+    for _ in range(samples):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - t0) / number)
+    times.sort()
+    return {
+        "median_us": round(1e6 * times[len(times) // 2], 3),
+        "p95_us": round(1e6 * times[min(len(times) - 1, int(0.95 * len(times)))], 3),
+        "mean_us": round(1e6 * sum(times) / len(times), 3),
+        "calls": number * samples,
+    }
+
+
+def synthetic_output(rng, imgsz, nc, boxes=40):
+    """Raw (4 + nc, anchors) YOLOv8 output with a few confident, overlapping boxes"""
+    anchors = sum((imgsz // s) ** 2 for s in (8, 16, 32))
+    pred = np.zeros((4 + nc, anchors), np.float32)
+    pred[0:2] = rng.uniform(0, imgsz, (2, anchors))
+    pred[2:4] = rng.uniform(8, 96, (2, anchors))
+    pred[4:] = rng.uniform(0, 0.2, (nc, anchors))
+    hot = rng.choice(anchors, boxes, replace=False)
+    pred[4 + rng.integers(0, nc, boxes), hot] = rng.uniform(0.5, 0.95, boxes)
+    # Clusters of near-duplicates so NMS has work to do
+    pred[0:2, hot[1::2]] = pred[0:2, hot[0::2]] + rng.uniform(-3, 3, (2, boxes // 2))
+    return pred
+
+
+def make_detector(model_path):
+    settings = Settings(model_path=model_path or "__no_model__.pt", zones={"bench": ZONES}, camera_id="bench",
+                        frame_deadline=0, inference_deadline=0, latency_slo_ms=0, fast_path=False)
+    detector = HandDetector(settings)
+    detector.watchdog.stop()
+    detector.degradation.stop()
+    return detector
+
+
+def run(args):
+    rng = np.random.default_rng(0)
+    detector = make_detector(args.model)
+    if detector.yolo_model is None:
+        print("[INFO] No model loaded: forward-pass stages skipped")
+    results = {}
+
+    for res_name, (w, h) in RESOLUTIONS.items():
+        frame = rng.integers(0, 255, (h, w, 3), dtype=np.uint8)
+        zones = detector.update_compiled_polygon(frame)
+        polygon = zones.polygons["red"][0]
+        points = [tuple(int(v) for v in p) for p in rng.integers(0, (w, h), (256, 2))]
+        index = [0]
+
+        def next_point():
+            index[0] = (index[0] + 1) & 255
+            return points[index[0]]
+
+        detector.zone_state.state = "red"  # hysteresis margin path, as while a hand is held in red
+
+        stages = {
+            "point_in_poly": lambda: point_in_poly_fast(next_point(), polygon),
+            "hand_zone": lambda: detector.get_hand_zone(next_point()),
+            "overlay": lambda: detector.draw_ui_overlay(frame),
+            "fit_frame": lambda: fit_frame(frame, *DISPLAY),
+        }
+        letterbox = Letterbox(h, w, args.imgsz, 32, True)
+        stages["letterbox"] = lambda: letterbox.fill(frame)
+
+        fast = FastPath.__new__(FastPath)
+        pred = synthetic_output(rng, args.imgsz, len(NAMES))
+        stages["postprocess"] = lambda: fast.decode(pred, letterbox, 0.5)
+
+        model = detector.yolo_model
+        if model is not None:
+            stages["forward_stock"] = lambda: model.predict_stock(frame, 0.5, args.imgsz)
+            if args.fast:
+                model.fast = FastPath(model.model, model.predict_stock, verify_frames=1)
+                model.predict(frame, 0.5, args.imgsz)  # verify this geometry once
+                stages["forward_fast"] = lambda: model.fast.predict(frame, 0.5, args.imgsz)
+
+        for stage, fn in stages.items():
+            if args.stages and stage not in args.stages:
+                continue
+            target = args.seconds * (10 if stage.startswith("forward") else 1)
+            key = f"{stage}@{res_name}"
+            results[key] = measure(fn, target)
+            r = results[key]
+            print(f"{key:<24} median {r['median_us']:11.1f} us  p95 {r['p95_us']:11.1f} us")
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Stages whose median is more than threshold slower than the baseline"""
+    regressions = []
+    print(f"\nvs baseline ({baseline.get('time', '?')}, {baseline.get('host', '?')}):")
+    for key, r in results.items():
+        old = baseline["results"].get(key)
+        if old is None:
+            continue
+        change = r["median_us"] / old["median_us"] - 1 if old["median_us"] else 0.0
+        flag = "REGRESSION" if change > threshold else ""
+        print(f"  {key:<24} {old['median_us']:11.1f} -> {r['median_us']:11.1f} us  {100 * change:+6.1f}%  {flag}")
+        if flag:
+            regressions.append(key)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", help="weights for the forward-pass stages (skipped without)")
+    parser.add_argument("--fast", action="store_true", help="also time the fast-path forward pass")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--stages", nargs="*", help="only these stages")
+    parser.add_argument("--seconds", type=float, default=TARGET_SECONDS, help="measuring time per stage")
+    parser.add_argument("--save", help="write results as a JSON baseline")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed median slowdown (0.15 = 15%%)")
+    args = parser.parse_args()
+
+    # One thread per library keeps runs comparable between hosts and loads
+    cv2.setNumThreads(1)
+    results = run(args)
+
+    report = {
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "cpu_count": os.cpu_count(),
+        "imgsz": args.imgsz,
+        "results": results,
+    }
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline written to {args.save}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} stage(s) regressed by more than {100 * args.threshold:.0f}%")
+            sys.exit(1)
+        print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Bit-for-bit parity and speed of the inference fast path against the stock Ultralytics path.
+
+Feeds every frame of a recorded clip (or synthetic frames) through both
+paths. The letterboxed input tensor and the boxes, scores and classes of
+every class must match exactly. Prints per-frame latency of both paths and
+exits 1 on the first mismatch.
+
+    python benchmarks/check_fast_path.py --source clip.mp4 --frames 300
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+
+from config import ConfigWatcher
+
+
+def frames_from(source, count, size):
+    if source:
+        cap = cv2.VideoCapture(source)
+        while count:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            count -= 1
+            yield frame
+        cap.release()
+        return
+    rng = np.random.default_rng(0)
+    w, h = size
+    for _ in range(count):
+        yield rng.integers(0, 255, (h, w, 3), dtype=np.uint8)
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+
+def main():
+    settings = ConfigWatcher().settings
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default=None, help="video file (default: synthetic frames)")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--size", default="1280x720", help="synthetic frame size WxH")
+    parser.add_argument("--imgsz", type=int, default=settings.imgsz)
+    parser.add_argument("--conf", type=float, default=settings.confidence)
+    parser.add_argument("--model", default=settings.resolved_model_path())
+    args = parser.parse_args()
+
+    from inference import LocalModel
+    from fast_path import FastPath
+
+    model = LocalModel(args.model)
+    fast = FastPath(model.model, model.predict_stock)
+    size = tuple(int(v) for v in args.size.lower().split("x"))
+
+    letterboxes = {}
+    stock_times, fast_times = [], []
+    checked = boxes = 0
+    for frame in frames_from(args.source, args.frames, size):
+        t0 = time.perf_counter()
+        stock = model.predict_stock(frame, args.conf, args.imgsz)
+        t1 = time.perf_counter()
+        key = frame.shape[:2]
+        if key not in letterboxes:
+            letterboxes[key] = fast.build(frame)
+            if letterboxes[key] is None:
+                sys.exit(1)
+        letterbox = letterboxes[key]
+        t2 = time.perf_counter()
+        fast.run(letterbox, frame, args.conf)
+        t3 = time.perf_counter()
+        stock_times.append(t1 - t0)
+        fast_times.append(t3 - t2)
+
+        problem = fast.compare(letterbox, frame, args.conf, stock)
+        if problem:
+            print(f"MISMATCH on frame {checked}: {problem}")
+            sys.exit(1)
+        checked += 1
+        boxes += len(stock.conf)
+
+    if not checked:
+        print("No frames read")
+        sys.exit(1)
+    for name, values in (("stock", sorted(stock_times)), ("fast", sorted(fast_times))):
+        print(f"{name:<6} p50 {1000 * percentile(values, 0.5):6.1f}  p95 {1000 * percentile(values, 0.95):6.1f} ms")
+    print(f"\n{checked} frame(s), {boxes} box(es): identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+import json
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass, field, fields, asdict, replace
+from typing import Optional
+from urllib.parse import urlsplit
+
+# ---------------- Defaults ----------------
+SETTINGS_PATH = "settings.json"
+WATCH_INTERVAL = 1.0  # seconds between mtime checks
+BACKENDS = ("pytorch", "onnx", "openvino")
+ZONE_POINTS = ("center", "corners")
+ZONE_SEVERITIES = ("yellow", "red")
+LEVEL_KEYS = ("name", "imgsz", "roi_only", "display_fps", "overlay")
+
+
+def _is_number(value):
+    """A finite int or float; bool is an int subclass but never a valid number here"""
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def _default_levels():
+    # Each level is cumulative; imgsz never exceeds the configured imgsz
+    return [
+        {"name": "full"},
+        {"name": "imgsz-480", "imgsz": 480},
+        {"name": "imgsz-320", "imgsz": 320},
+        {"name": "roi-only", "imgsz": 320, "roi_only": True},
+        {"name": "display-10fps", "imgsz": 320, "roi_only": True, "display_fps": 10},
+        {"name": "overlay-off", "imgsz": 320, "roi_only": True, "display_fps": 10, "overlay": False},
+    ]
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Validated contents of settings.json"""
+    confidence: float = 0.5
+    rtsp_url: str = ""
+    camera_index: Optional[int] = 0  # local camera; None streams from rtsp_url
+    # Dual-stream: detect on this low-res stream (e.g. .../Streaming/Channels/102); rtsp_url is then
+    # only buffered, undecoded, for high-resolution intrusion evidence
+    substream_url: str = ""
+    model_path: str = os.path.join("runs", "detect", "train", "weights", "best.pt")
+    backend: str = "pytorch"
+    model_server: str = ""  # socket/pipe address of model_server.py; empty loads weights in-process
+    imgsz: int = 640
+    frame_skip: int = 2  # run detection on every Nth frame
+    fast_path: bool = True  # preallocated letterbox + NumPy NMS, verified against the stock path per resolution
+    zone_enter_dwell: float = 0.1  # seconds a hand must stay in a more severe zone before it counts
+    zone_exit_dwell: float = 1.0  # seconds a hand must stay out before the state relaxes
+    zone_hysteresis: float = 0.02  # exit margin around the held zone, as a fraction of frame width
+    # Points of a hand box tested against the zones: "center", or "corners" (four corners and the
+    # center, the most severe zone wins, so a hand reaching into red with one edge counts as red)
+    zone_points: str = "center"
+    latch_red: bool = True  # red stays latched until reset from the GUI
+    evidence_pre: float = 3.0  # dual-stream: seconds of main stream kept before an intrusion
+    evidence_post: float = 2.0  # dual-stream: seconds of main stream kept after an intrusion
+    stream_offset: float = 0.0  # dual-stream: seconds the main stream arrives later than the sub-stream
+    frame_deadline: float = 1.0  # max age of the newest camera frame before the fail-safe fires; 0 disables
+    inference_deadline: float = 1.0  # max time without a detection result before the fail-safe fires; 0 disables
+    latency_slo_ms: float = 250.0  # p95 queue age + inference target for degradation; 0 disables
+    degradation_levels: list = field(default_factory=_default_levels)
+    cpu_budget: int = 0  # cores for this camera's pipeline; 0 keeps library thread defaults
+    cpu_pin_start: Optional[int] = None  # first core of this camera's block when pinning stages
+    mine_hard_examples: bool = False  # save uncertain frames with pseudo-labels to hard_examples/
+    mine_conf_band: list = field(default_factory=lambda: [0.25, 0.5])  # [low, high) hand/glove confidence
+    mine_daily_mb: float = 500.0  # disk budget per day for mined frames
+    mine_hash_distance: int = 6  # dHash bits within which frames count as duplicates
+    camera_id: str = ""  # key for persisted zones; derived from the source when empty
+    # {camera_id: [{"severity": "red", "points": [[x, y], ...]}, ...]} in normalized 0..1 coordinates
+    zones: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build Settings from raw JSON, raising ValueError listing every problem"""
+        if not isinstance(data, dict):
+            raise ValueError("settings must be a JSON object")
+
+        known = {f.name for f in fields(cls)}
+        errors = [f"unknown key '{key}'" for key in data if key not in known]
+        values = {key: value for key, value in data.items() if key in known}
+
+        conf = values.get("confidence", cls.confidence)
+        if not _is_number(conf) or not 0.0 < conf < 1.0:
+            errors.append("confidence must be a number between 0 and 1")
+
+        for key in ("rtsp_url", "substream_url", "model_path", "camera_id", "model_server"):
+            if not isinstance(values.get(key, ""), str):
+                errors.append(f"{key} must be a string")
+
+        index = values.get("camera_index", cls.camera_index)
+        if index is not None and (not isinstance(index, int) or isinstance(index, bool) or index < 0):
+            errors.append("camera_index must be a non-negative integer or null")
+        if index is None and not values.get("rtsp_url"):
+            errors.append("rtsp_url is required when camera_index is null")
+        if values.get("substream_url") and index is not None:
+            errors.append("substream_url requires camera_index null (rtsp_url is the main stream)")
+
+        if values.get("backend", cls.backend) not in BACKENDS:
+            errors.append(f"backend must be one of {', '.join(BACKENDS)}")
+        if values.get("zone_points", cls.zone_points) not in ZONE_POINTS:
+            errors.append(f"zone_points must be one of {', '.join(ZONE_POINTS)}")
+
+        imgsz = values.get("imgsz", cls.imgsz)
+        if not isinstance(imgsz, int) or isinstance(imgsz, bool) or imgsz < 32 or imgsz % 32:
+            errors.append("imgsz must be a positive multiple of 32")
+
+        skip = values.get("frame_skip", cls.frame_skip)
+        if not isinstance(skip, int) or isinstance(skip, bool) or skip < 1:
+            errors.append("frame_skip must be an integer >= 1")
+
+        for key in ("latch_red", "fast_path"):
+            if not isinstance(values.get(key, getattr(cls, key)), bool):
+                errors.append(f"{key} must be true or false")
+
+        for key in ("zone_enter_dwell", "zone_exit_dwell", "zone_hysteresis", "frame_deadline", "inference_deadline",
+                    "evidence_pre", "evidence_post"):
+            value = values.get(key, getattr(cls, key))
+            if not _is_number(value) or value < 0:
+                errors.append(f"{key} must be a number >= 0")
+
+        offset = values.get("stream_offset", cls.stream_offset)
+        if not _is_number(offset):
+            errors.append("stream_offset must be a number")
+
+        slo = values.get("latency_slo_ms", cls.latency_slo_ms)
+        if not _is_number(slo) or slo < 0:
+            errors.append("latency_slo_ms must be a number >= 0")
+        levels = values.get("degradation_levels", _default_levels())
+        if not isinstance(levels, list) or not levels or not all(
+                isinstance(level, dict) and set(level) <= set(LEVEL_KEYS) for level in levels):
+            errors.append(f"degradation_levels must be a non-empty list of objects with keys {', '.join(LEVEL_KEYS)}")
+        else:
+            for level in levels:
+                size = level.get("imgsz")
+                if size is not None and (not isinstance(size, int) or isinstance(size, bool) or size < 32 or size % 32):
+                    errors.append(f"degradation level '{level.get('name')}' imgsz must be a positive multiple of 32")
+                fps = level.get("display_fps")
+                if fps is not None and (not _is_number(fps) or fps <= 0):
+                    errors.append(f"degradation level '{level.get('name')}' display_fps must be > 0")
+
+        if not isinstance(values.get("mine_hard_examples", cls.mine_hard_examples), bool):
+            errors.append("mine_hard_examples must be true or false")
+        band = values.get("mine_conf_band", [0.25, 0.5])
+        if not isinstance(band, list) or len(band) != 2 or not all(
+                _is_number(v) for v in band) or not 0.0 < band[0] < band[1] <= 1.0:
+            errors.append("mine_conf_band must be [low, high] with 0 < low < high <= 1")
+        daily_mb = values.get("mine_daily_mb", cls.mine_daily_mb)
+        if not _is_number(daily_mb) or daily_mb < 0:
+            errors.append("mine_daily_mb must be a number >= 0")
+        distance = values.get("mine_hash_distance", cls.mine_hash_distance)
+        if not isinstance(distance, int) or isinstance(distance, bool) or not 0 <= distance <= 64:
+            errors.append("mine_hash_distance must be an integer between 0 and 64")
+
+        budget = values.get("cpu_budget", cls.cpu_budget)
+        if not isinstance(budget, int) or isinstance(budget, bool) or budget < 0:
+            errors.append("cpu_budget must be an integer >= 0")
+        pin_start = values.get("cpu_pin_start", cls.cpu_pin_start)
+        if pin_start is not None and (not isinstance(pin_start, int) or isinstance(pin_start, bool) or pin_start < 0):
+            errors.append("cpu_pin_start must be a non-negative integer or null")
+
+        zones = values.get("zones", {})
+        if not isinstance(zones, dict):
+            errors.append("zones must be an object keyed by camera id")
+        else:
+            for camera, camera_zones in zones.items():
+                if not isinstance(camera_zones, list):
+                    errors.append(f"zones for '{camera}' must be a list")
+                    continue
+                for zone in camera_zones:
+                    if not isinstance(zone, dict) or zone.get("severity") not in ZONE_SEVERITIES:
+                        errors.append(f"zones for '{camera}' need a severity of {', '.join(ZONE_SEVERITIES)}")
+                        continue
+                    points = zone.get("points")
+                    if not isinstance(points, list) or len(points) < 3 or not all(
+                            isinstance(p, (list, tuple)) and len(p) == 2 and
+                            all(_is_number(v) and 0.0 <= v <= 1.0 for v in p) for p in points):
+                        errors.append(f"{zone['severity']} zone for '{camera}' needs >= 3 normalized [x, y] points")
+
+        if errors:
+            raise ValueError("; ".join(errors))
+        if "confidence" in values:
+            values["confidence"] = float(values["confidence"])
+        return cls(**values)
+
+    def resolved_model_path(self):
+        """Weights path for the configured backend (Ultralytics export naming)"""
+        stem, _ = os.path.splitext(self.model_path)
+        if self.backend == "onnx":
+            return stem + ".onnx"
+        if self.backend == "openvino":
+            return stem + "_openvino_model"
+        return self.model_path
+
+    def zone_key(self):
+        """Camera key zones are stored under: explicit camera_id, else stream host or local index"""
+        if self.camera_id:
+            return self.camera_id
+        if self.camera_index is not None:
+            return f"local{self.camera_index}"
+        return urlsplit(self.rtsp_url).hostname or self.rtsp_url
+
+    def camera_zones(self):
+        return self.zones.get(self.zone_key(), [])
+
+    def with_camera_zones(self, zone_list):
+        """Copy of these settings with this camera's zones replaced"""
+        zones = dict(self.zones)
+        if zone_list:
+            zones[self.zone_key()] = zone_list
+        else:
+            zones.pop(self.zone_key(), None)
+        return replace(self, zones=zones)
+
+    def diff(self, other):
+        """Names of fields whose values differ from other"""
+        return {f.name for f in fields(self) if getattr(self, f.name) != getattr(other, f.name)}
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def load_settings(path=SETTINGS_PATH):
+    with open(path, "r", encoding="utf-8") as f:
+        return Settings.from_dict(json.load(f))
+
+
+class ConfigWatcher:
+    """Reloads settings.json when it changes and reports which fields changed.
+
+    Listeners are called as listener(old, new, changed). Use start() to poll
+    from a background thread, or call check() from an existing loop (e.g. Tk
+    after()) so listeners run on that loop's thread.
+    """
+
+    def __init__(self, path=SETTINGS_PATH, interval=WATCH_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.listeners = []
+        self._mtime = None
+        self._running = False
+        try:
+            self.settings = load_settings(path)
+            self._mtime = os.path.getmtime(path)
+        except FileNotFoundError:
+            print(f"[WARNING] {path} not found, using default settings")
+            self.settings = Settings()
+        except ValueError as e:
+            print(f"[ERROR] Invalid {path}: {e}. Using default settings")
+            self.settings = Settings()
+            self._mtime = os.path.getmtime(path)
+
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+
+    def check(self):
+        """Reload if the file changed; returns the set of changed fields"""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return set()
+        if mtime == self._mtime:
+            return set()
+        self._mtime = mtime
+
+        try:
+            new = load_settings(self.path)
+        except (ValueError, OSError) as e:
+            # Half-written or invalid file: keep running on the last good settings
+            print(f"[ERROR] Ignoring invalid {self.path}: {e}")
+            return set()
+
+        old, self.settings = self.settings, new
+        changed = new.diff(old)
+        if changed:
+            print(f"[CONFIG] Reloaded {self.path}: {', '.join(sorted(changed))}")
+            for listener in self.listeners:
+                try:
+                    listener(old, new, changed)
+                except Exception as e:
+                    print(f"[ERROR] Applying settings failed: {e}")
+        return changed
+
+    def save(self, settings):
+        """Write settings atomically so the watcher never reads a partial file"""
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(settings.to_dict(), f, indent=2)
+        os.replace(tmp, self.path)
+        self.settings = settings
+        self._mtime = os.path.getmtime(self.path)
+
+    def start(self):
+        self._running = True
+        threading.Thread(target=self._watch, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._running = False
+
+    def _watch(self):
+        while self._running:
+            self.check()
+            time.sleep(self.interval)
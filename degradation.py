@@ -0,0 +1,123 @@
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+# ---------------- Defaults ----------------
+EVAL_INTERVAL = 1.0  # seconds between evaluations
+MIN_SAMPLES = 10  # inference samples needed at a level before judging it
+DOWN_AFTER = 2  # consecutive evaluations over the SLO before stepping down
+UP_AFTER = 5  # consecutive evaluations with headroom before stepping up
+HEADROOM = 0.6  # step up only when latency is below this fraction of the SLO
+EVENT_LOG = os.path.join("diagnostics", "degradation.jsonl")
+
+# imgsz None keeps the configured size, display_fps None leaves display unthrottled
+Level = namedtuple("Level", ["name", "imgsz", "roi_only", "display_fps", "overlay"])
+
+
+def make_levels(level_dicts):
+    return [Level(d.get("name", f"level-{i}"), d.get("imgsz"), d.get("roi_only", False),
+                  d.get("display_fps"), d.get("overlay", True)) for i, d in enumerate(level_dicts)]
+
+
+class DegradationController:
+    """Holds a detection latency SLO by stepping through degradation levels.
+
+    Detection latency is taken as p95 queue age plus p95 inference time,
+    measured only over samples taken at the current level. Steps down one
+    level when that exceeds the SLO for DOWN_AFTER evaluations, and back
+    up after UP_AFTER evaluations under HEADROOM x SLO. Every change is
+    printed and appended to diagnostics/degradation.jsonl.
+    """
+
+    def __init__(self, metrics, levels, slo_ms, on_change, interval=EVAL_INTERVAL, event_log=EVENT_LOG):
+        self.metrics = metrics
+        self.levels = levels
+        self.slo = slo_ms / 1000.0
+        self.on_change = on_change
+        self.interval = interval
+        self.event_log = event_log
+
+        self.level = 0
+        self.over = 0
+        self.under = 0
+        self._count_at_change = {"inference": 0, "queue": 0}  # samples per stage when the level last changed
+        self._running = False
+        metrics.gauges["degradation_level"] = 0
+
+    @property
+    def current(self):
+        return self.levels[self.level]
+
+    def start(self):
+        self._running = True
+        threading.Thread(target=self._run, name="degradation", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._running = False
+
+    def _run(self):
+        while self._running:
+            time.sleep(self.interval)
+            if self.slo > 0:
+                self.evaluate()
+
+    def evaluate(self):
+        # Queue age is sampled per captured frame, inference per detected frame: count each separately
+        counts = self.metrics.latency_count
+        fresh = {stage: counts[stage] - n for stage, n in self._count_at_change.items()}
+        if fresh["inference"] < MIN_SAMPLES:
+            return None
+
+        inference = self.metrics.percentiles("inference", (0.95,), last=fresh["inference"])[0.95]
+        queue_age = (self.metrics.percentiles("queue", (0.95,), last=fresh["queue"])[0.95]
+                     if fresh["queue"] else None) or 0.0
+        latency = inference + queue_age
+
+        if latency > self.slo:
+            self.over, self.under = self.over + 1, 0
+        elif latency < self.slo * HEADROOM:
+            self.over, self.under = 0, self.under + 1
+        else:
+            self.over = self.under = 0
+
+        if self.over >= DOWN_AFTER and self.level < len(self.levels) - 1:
+            self.set_level(self.level + 1, latency)
+        elif self.under >= UP_AFTER and self.level > 0:
+            self.set_level(self.level - 1, latency)
+        return latency
+
+    def set_level(self, level, latency=None):
+        old_level, old = self.level, self.current
+        self.level = level
+        self.over = self.under = 0
+        counts = self.metrics.latency_count
+        self._count_at_change = {stage: counts[stage] for stage in self._count_at_change}
+        self.metrics.gauges["degradation_level"] = level
+        self.metrics.inc("degradation_changes")
+
+        direction = "down" if level > old_level else "up"
+        detail = f" (p95 {latency * 1000:.0f} ms vs SLO {self.slo * 1000:.0f} ms)" if latency is not None else ""
+        print(f"[DEGRADE] Stepped {direction}: {old.name} -> {self.current.name}{detail}")
+        self._log(old, direction, latency)
+        self.on_change(self.current)
+
+    def _log(self, old, direction, latency):
+        event = {
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "direction": direction,
+            "from": old.name,
+            "to": self.current.name,
+            "level": self.level,
+            "p95_ms": round(latency * 1000, 1) if latency is not None else None,
+            "slo_ms": round(self.slo * 1000, 1),
+        }
+        try:
+            os.makedirs(os.path.dirname(self.event_log) or ".", exist_ok=True)
+            with open(self.event_log, "a", encoding="utf-8") as f:
+                f.write(json.dumps(event) + "\n")
+        except OSError as e:
+            print(f"[DEGRADE] Could not write {self.event_log}: {e}")
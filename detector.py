@@ -0,0 +1,550 @@
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from metrics import PipelineMetrics
+from config import Settings
+from zones import ZoneSet
+from inference import Detections, load_model
+from resources import CorePlan
+from stall_watchdog import StallWatchdog
+from degradation import DegradationController, make_levels
+from zone_state import ZoneStateMachine, RANK
+from hard_examples import HardExampleMiner
+from evidence import EvidenceRecorder
+
+
+# ---------------- Defaults ----------------
+INTRUSION_DIR = "intrusions"
+INTRUSION_COOLDOWN = 1.0  # seconds between intrusion snapshots while red is held
+MASTER_COMMAND = ["python3", "/full/path/master.py"]
+
+
+def fit_frame(frame, width, height):
+    """Aspect-preserving resize onto a black width x height canvas.
+
+    Returns (canvas, scale, x_offset, y_offset) so display clicks can be mapped back to frame pixels.
+    """
+    h, w = frame.shape[:2]
+    scale = min(width / w, height / h)
+    new_w, new_h = int(w * scale), int(h * scale)
+    resized = cv2.resize(frame, (new_w, new_h))
+
+    canvas = np.zeros((height, width, frame.shape[2]), dtype=np.uint8)
+    x_offset = (width - new_w) // 2
+    y_offset = (height - new_h) // 2
+    canvas[y_offset:y_offset + new_h, x_offset:x_offset + new_w] = resized
+    return canvas, scale, x_offset, y_offset
+
+
+class HandDetector:
+    """Capture, inference, zones, alerts and intrusion storage for one camera.
+
+    Shared by the Tk GUI, the OpenCV viewer and the headless service; it
+    imports no GUI toolkit. Front-ends call process_frame() on frames from
+    get_frame() and draw draw_ui_overlay() if they display anything.
+    """
+
+    def __init__(self, settings=None):
+        self.settings = settings or Settings()
+        self.master_triggered = False
+        self.stop_cause = None  # "zone" or "watchdog" while master_triggered
+        self.trigger_lock = threading.Lock()
+
+        self.detection_enabled = False
+        self.hand_detected = False
+        self.detection_count = 0
+        self.current_zone = None
+        self.last_intrusion_save_time = 0
+        self.intrusion_save_cooldown = INTRUSION_COOLDOWN
+
+        self.frame_queue = queue.Queue(maxsize=2)
+        self.frame_skip = self.settings.frame_skip
+        self.frame_count = 0
+        self.last_boxes = []  # (x1, y1, x2, y2, color) redrawn on skipped frames
+        self.inference_failing = False  # log an inference error once per failure streak
+
+        self.confidence = self.settings.confidence
+        self.imgsz = self.settings.imgsz
+
+        # Knobs driven by the degradation controller
+        self.roi_only = False
+        self.display_fps = None
+        self.overlay_enabled = True
+
+        self.metrics = PipelineMetrics()
+
+        # Debounced zone state: one actuation per real red event
+        self.zone_hysteresis = self.settings.zone_hysteresis
+        self.zone_state = ZoneStateMachine(
+            self.settings.zone_enter_dwell,
+            self.settings.zone_exit_dwell,
+            self.settings.latch_red,
+            self.on_zone_change
+        )
+        self.zone_counts = (0, 0, 0)  # zone_state counters already added to metrics
+
+        # Fail-safe when frames or detection results stop arriving while detection is active
+        self.watchdog = StallWatchdog(
+            self.on_stall,
+            lambda: self.detection_enabled and self.is_capturing,
+            self.settings.frame_deadline,
+            self.settings.inference_deadline,
+            self.metrics,
+            on_recover=self.on_stall_recovered
+        )
+
+        # Zones are stored normalized per camera and compiled per frame resolution
+        self.set_zones(self.settings.camera_zones())
+
+        self.drawing_mode = False
+        self.drawing_points = []  # List of collected points for the current zone (frame pixels)
+        self.current_drawing_zone = None  # Track which zone is being drawn: 'yellow' or 'red'
+
+        self.intrusion_save_path = INTRUSION_DIR
+        os.makedirs(self.intrusion_save_path, exist_ok=True)
+
+        # Size torch/OpenCV/decoder pools before the model loads. Inference cores are pinned by the
+        # thread that first runs detect_hands, not here: threads started by a pinned thread inherit its mask
+        self.core_plan = CorePlan.from_settings(self.settings)
+        self.inference_thread = None  # ident of the thread pinned to the inference cores
+        if self.core_plan:
+            self.core_plan.apply_process(load_torch=not self.settings.model_server)
+            print(f"[INFO] CPU budget: {self.core_plan.describe()}")
+
+        self.yolo_model = self.load_model(self.settings)
+
+        # Optional: uncertain frames saved off the detection thread for retraining
+        self.miner = self.make_miner(self.settings)
+
+        self.camera = None
+        self.is_capturing = False
+        self.capture_stop = threading.Event()
+        self.frame_time = 0.0  # wall-clock arrival of the frame being processed
+        self.evidence = None  # main-stream recorder in dual-stream mode
+        self.evidence_event = None  # evidence of the current red episode, extended while red persists
+        self.watchdog.start()
+
+        # Steps through degradation levels to hold the latency SLO under load
+        self.degradation = DegradationController(
+            self.metrics,
+            make_levels(self.settings.degradation_levels),
+            self.settings.latency_slo_ms,
+            self.apply_degradation
+        ).start()
+
+    def load_model(self, settings):
+        """Local weights, or a client of the shared model server when configured"""
+        try:
+            return load_model(settings)
+        except Exception as e:
+            print(f"Error loading YOLO: {e}")
+            return None
+
+    def apply_settings(self, old, new, changed):
+        """Apply a settings change to only the stages it affects"""
+        self.settings = new
+
+        # Per-frame parameters: picked up on the next frame, no reload
+        self.confidence = new.confidence
+        self.frame_skip = new.frame_skip
+        self.zone_state.enter_dwell = new.zone_enter_dwell
+        self.zone_state.exit_dwell = new.zone_exit_dwell
+        self.zone_state.latch_red = new.latch_red
+        self.zone_hysteresis = new.zone_hysteresis
+        if self.evidence is not None:
+            self.evidence.pre, self.evidence.post = new.evidence_pre, new.evidence_post
+            self.evidence.offset = new.stream_offset
+        self.watchdog.frame_deadline = new.frame_deadline
+        self.watchdog.inference_deadline = new.inference_deadline
+
+        self.degradation.slo = new.latency_slo_ms / 1000.0
+        if "degradation_levels" in changed:
+            self.degradation.levels = make_levels(new.degradation_levels)
+            self.degradation.level = min(self.degradation.level, len(self.degradation.levels) - 1)
+        self.apply_degradation(self.degradation.current)
+
+        if changed & {"zones", "camera_id", "camera_index", "rtsp_url"}:
+            self.set_zones(new.camera_zones())
+
+        if changed & {"mine_hard_examples", "mine_conf_band", "mine_daily_mb", "mine_hash_distance"}:
+            old_miner, self.miner = self.miner, self.make_miner(new)
+            if old_miner is not None:
+                old_miner.stop()
+
+        if changed & {"model_path", "backend", "model_server", "fast_path"}:
+            # Load next to the running model and swap once ready
+            def reload():
+                model = self.load_model(new)
+                if model is not None:
+                    old_model, self.yolo_model = self.yolo_model, model
+                    if old_model is not None:
+                        old_model.close()
+                    self.apply_degradation(self.degradation.current)
+                    print(f"[CONFIG] Model reloaded: {new.model_server or new.resolved_model_path()}")
+            threading.Thread(target=reload, daemon=True).start()
+
+        if changed & {"rtsp_url", "substream_url", "camera_index"} and self.is_capturing:
+            threading.Thread(target=self.restart_capture, daemon=True).start()
+
+    def make_miner(self, settings):
+        if not settings.mine_hard_examples:
+            return None
+        print(f"[INFO] Mining hard examples with confidence in {settings.mine_conf_band}")
+        return HardExampleMiner(
+            settings.mine_conf_band,
+            settings.mine_daily_mb,
+            settings.mine_hash_distance,
+            metrics=self.metrics
+        ).start()
+
+    def apply_degradation(self, level):
+        self.imgsz = min(level.imgsz, self.settings.imgsz) if level.imgsz else self.settings.imgsz
+        self.roi_only = level.roi_only
+        self.display_fps = level.display_fps
+        self.overlay_enabled = level.overlay
+        # Fast path verification runs inference twice: not while degraded
+        pause = getattr(self.yolo_model, "pause_verification", None)
+        if pause is not None:
+            pause(self.degradation.level > 0)
+
+    def set_zones(self, zone_list):
+        self.zone_set = ZoneSet(zone_list)
+        self.compiled_zones = self.zone_set.compile(0, 0)
+
+    def reset_zones(self):
+        # No default zones
+        self.set_zones([])
+
+    def add_zone(self, severity, points, width, height):
+        """Add a zone drawn in pixels on a width x height frame"""
+        self.zone_set.add_pixels(severity, points, width, height)
+        self.compiled_zones = self.zone_set.compile(0, 0)
+
+    def has_zones(self):
+        return not self.zone_set.is_empty()
+
+    def update_compiled_polygon(self, frame):
+        """Compile zones for this frame's resolution (cached per resolution)"""
+        h, w = frame.shape[:2]
+        if (self.compiled_zones.width, self.compiled_zones.height) != (w, h):
+            self.compiled_zones = self.zone_set.compile(w, h)
+        return self.compiled_zones
+
+    def get_hand_zone(self, pt):
+        # Hysteresis: the zone currently held extends by a margin, so leaving it takes a clear exit
+        state = self.zone_state.state
+        grow = {state: self.zone_hysteresis * self.compiled_zones.width} if state else None
+        return self.compiled_zones.zone_of(pt, grow)
+
+    def get_box_zone(self, x1, y1, x2, y2):
+        """Zone of a hand box: its center, or with zone_points "corners" the most severe of corners and center"""
+        center = (int((x1 + x2) / 2), int((y1 + y2) / 2))
+        if self.settings.zone_points != "corners":
+            return self.get_hand_zone(center)
+        zone = None
+        for pt in ((int(x1), int(y1)), (int(x2), int(y1)), (int(x1), int(y2)), (int(x2), int(y2)), center):
+            pt_zone = self.get_hand_zone(pt)
+            if RANK[pt_zone] > RANK[zone]:
+                zone = pt_zone
+        return zone
+
+    def start_capture(self, source=None):
+        """Open the configured camera, or read from `source` (anything with read()/release())"""
+        if source is not None:
+            self.camera = source
+        elif self.settings.camera_index is None:
+            # Dual-stream: detection decodes only the sub-stream
+            url = self.settings.substream_url or self.settings.rtsp_url
+            self.camera = cv2.VideoCapture(url, cv2.CAP_FFMPEG)
+        else:
+            # DirectShow opens USB cameras fastest on Windows; let OpenCV pick elsewhere
+            api = cv2.CAP_DSHOW if sys.platform == "win32" else cv2.CAP_ANY
+            self.camera = cv2.VideoCapture(self.settings.camera_index, api)
+        if source is None and not self.camera.isOpened(): return False
+        if source is None and self.settings.camera_index is None and self.settings.substream_url:
+            s = self.settings
+            self.evidence = EvidenceRecorder(s.rtsp_url, s.evidence_pre, s.evidence_post, s.stream_offset,
+                                             self.metrics).start()
+        self.is_capturing = True
+        # Each capture thread gets its own stop event so a restart never revives an old reader
+        self.capture_stop = threading.Event()
+        threading.Thread(target=self.frame_capture_thread, args=(self.camera, self.capture_stop), daemon=True).start()
+        return True
+
+    def stop_capture(self):
+        self.is_capturing = False
+        self.capture_stop.set()
+        if self.camera: self.camera.release()
+        if self.evidence is not None:
+            self.evidence.stop()
+            self.evidence = None
+            self.evidence_event = None
+
+    def restart_capture(self):
+        self.stop_capture()
+        if self.start_capture():
+            print("[CONFIG] Camera reconnected with new settings")
+        else:
+            print("[ERROR] Failed to reconnect camera with new settings")
+
+    def frame_capture_thread(self, camera, stop):
+        metrics = self.metrics
+        if self.core_plan:
+            self.core_plan.pin("capture")
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            ret, frame = camera.read()
+            if not ret:
+                metrics.inc("capture_failures")
+                continue
+            self.watchdog.frame_arrived()
+            metrics.observe("capture", time.perf_counter() - t0)
+            metrics.inc("frames_captured")
+            metrics.tick("capture")
+            try:
+                if self.frame_queue.full():
+                    self.frame_queue.get_nowait()
+                    metrics.inc("frames_dropped")
+                self.frame_queue.put((time.perf_counter(), frame.copy()), block=False)
+            except:
+                pass
+
+    def process_frame(self, frame):
+        """Detect on every frame_skip-th frame and redraw the last boxes on the rest.
+
+        Returns (frame, (hand_detected, zone)), or (frame, None) for a skipped frame.
+        """
+        self.frame_count += 1
+        if self.frame_count % self.frame_skip == 0:
+            frame, detected, zone = self.detect_hands(frame)
+            return frame, (detected, zone)
+        self.draw_last_detections(frame)
+        return frame, None
+
+    def detect_hands(self, frame):
+        if not self.detection_enabled or self.yolo_model is None:
+            return frame, False, None
+
+        if self.core_plan and self.inference_thread != threading.get_ident():
+            # The GUI runs detection on the Tk thread, the headless service on its main loop
+            self.inference_thread = threading.get_ident()
+            self.core_plan.pin("inference")
+
+        hand_detected, zone = False, None
+        self.last_boxes = []
+        self.update_compiled_polygon(frame)
+        t0 = time.perf_counter()
+        model = self.yolo_model
+        miner = self.miner
+        # When mining, predict down to the band's low end and keep only confident boxes for zones
+        conf = min(self.confidence, miner.low) if miner else self.confidence
+        roi = self.compiled_zones.bounds() if self.roi_only else None
+        self.watchdog.inference_started()
+        try:
+            if roi is None:
+                det = model.predict(frame, conf, self.imgsz)
+            else:
+                # Only the area around the zones; shift boxes back to frame coordinates
+                x0, y0, x1, y1 = roi
+                det = model.predict(frame[y0:y1, x0:x1], conf, self.imgsz)
+                det = det._replace(xyxy=det.xyxy + np.array([x0, y0, x0, y0], dtype=det.xyxy.dtype))
+        except Exception as e:
+            # No result for this frame: the watchdog still fires if inference stays down
+            self.metrics.inc("inference_errors")
+            if not self.inference_failing:
+                print(f"[ERROR] Inference failed: {e}")
+            self.inference_failing = True
+            return frame, False, self.zone_state.state
+        if self.inference_failing:
+            print("[INFO] Inference recovered")
+            self.inference_failing = False
+        self.watchdog.inference_finished()
+        t1 = time.perf_counter()
+        self.metrics.observe("inference", t1 - t0)
+        self.metrics.inc("frames_inferred")
+
+        if miner:
+            # Before any boxes are drawn on the frame
+            miner.submit(frame, det, model.names)
+            keep = det.conf >= self.confidence
+            det = Detections(det.xyxy[keep], det.conf[keep], det.cls[keep])
+
+        raw_zone = None
+        for (x1, y1, x2, y2), cls_id in zip(det.xyxy, det.cls):
+            name = model.names[int(cls_id)].lower()
+
+            if "hand" in name or "glove" in name:
+                hand_detected = True
+                zone = self.get_box_zone(x1, y1, x2, y2)
+
+                color = (0, 0, 255) if zone == "red" else (0, 255, 255) if zone == "yellow" else (0, 255, 0)
+                cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), color, 2)
+                self.last_boxes.append((int(x1), int(y1), int(x2), int(y2), color))
+
+                # The most severe hand decides this frame's zone
+                if RANK[zone] > RANK[raw_zone]:
+                    raw_zone = zone
+
+        # -------- CALL master.py ONCE per confirmed red event --------
+        zone = self.zone_state.update(raw_zone)
+        self.mirror_zone_counters()
+
+        # Snapshots need a hand actually in red; the latched state only drives actuation and the UI
+        if raw_zone == "red":
+            self.save_intrusion(frame, confirmed=zone == "red")
+
+        self.metrics.observe("postprocess", time.perf_counter() - t1)
+        return frame, hand_detected, zone
+
+    def mirror_zone_counters(self):
+        """Add the zone state machine's new events to the metrics counters"""
+        counts = (self.zone_state.actuations, self.zone_state.suppressed, self.zone_state.filtered)
+        if counts == self.zone_counts:
+            return
+        for name, new, old in zip(("zone_actuations", "zone_retriggers_suppressed", "zone_flicker_filtered"),
+                                  counts, self.zone_counts):
+            if new != old:
+                self.metrics.inc(name, new - old)
+        self.zone_counts = counts
+
+    def on_zone_change(self, old, new):
+        self.current_zone = new
+        if new == "red":
+            self.detection_count += 1
+            print("[EMERGENCY] EMERGENCY STOP - Glove in Red Zone")
+            self.trigger_stop("glove in red zone")
+        elif new == "yellow":
+            print("[WARNING] MACHINE SLOWING DOWN - Glove in Yellow Zone")
+        else:
+            print("[INFO] Glove left safety zone")
+        if old == "red" and new != "red":
+            # Red released (explicit reset, or exit dwell when not latching)
+            self.clear_stop()
+            self.evidence_event = None
+
+    def save_intrusion(self, frame, confirmed=True):
+        """Snapshot of a hand in red, at most once per cooldown; written off the detection thread.
+
+        In dual-stream mode the first snapshot of a confirmed red episode also
+        starts its evidence clip, which is extended while a hand is still seen in red.
+        """
+        start_evidence = confirmed and self.evidence is not None and self.evidence_event is None
+        if confirmed and self.evidence is not None and self.evidence_event is not None:
+            self.evidence.extend(self.evidence_event, self.frame_time)
+        now = time.monotonic()
+        if now - self.last_intrusion_save_time < self.intrusion_save_cooldown and not start_evidence:
+            return None
+        self.last_intrusion_save_time = now
+        filename = os.path.join(self.intrusion_save_path,
+                                f"intrusion_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg")
+        threading.Thread(target=cv2.imwrite, args=(filename, frame.copy()), daemon=True).start()
+        if start_evidence:
+            # Replaced by a main-stream still of the same moment once its post-roll is recorded
+            h, w = frame.shape[:2]
+            self.evidence_event = self.evidence.capture(filename, self.frame_time, self.last_boxes, (w, h),
+                                                        self.zone_set)
+        return filename
+
+    def reset_latch(self):
+        """Operator reset after a red stop or a watchdog fail-safe"""
+        was_latched = self.zone_state.reset() or self.master_triggered
+        self.clear_stop()
+        return was_latched
+
+    def stop_latched(self):
+        """A red stop is latched, or a stop was sent and not yet released"""
+        return self.zone_state.latched or self.master_triggered
+
+    def clear_stop(self):
+        with self.trigger_lock:
+            self.master_triggered = False
+            self.stop_cause = None
+
+    def on_stall(self, reason):
+        self.metrics.inc("watchdog_stops")
+        self.trigger_stop(reason, cause="watchdog")
+
+    def on_stall_recovered(self):
+        # A stall stop ends with the stall, so the next red intrusion actuates again
+        with self.trigger_lock:
+            if self.stop_cause != "watchdog":
+                return
+            self.master_triggered = False
+            self.stop_cause = None
+        print("[WATCHDOG] Fail-safe stop released; red intrusions actuate again")
+
+    def trigger_stop(self, reason, cause="zone"):
+        """Single actuation path for red-zone intrusions and watchdog fail-safes"""
+        with self.trigger_lock:
+            if self.master_triggered:
+                print(f"[EMERGENCY] Machine stop already sent ({self.stop_cause}), not repeated: {reason}")
+                return
+            self.master_triggered = True
+            self.stop_cause = cause
+        self.actuate(reason)
+
+    def actuate(self, reason):
+        print(f"[EMERGENCY] Machine stop: {reason}")
+        subprocess.Popen(
+            MASTER_COMMAND,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+
+    def draw_last_detections(self, frame):
+        """Redraw the previous detection boxes on frames skipped by frame_skip"""
+        for x1, y1, x2, y2, color in self.last_boxes:
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+        return frame
+
+    def draw_ui_overlay(self, frame):
+        t0 = time.perf_counter()
+        zones = self.update_compiled_polygon(frame)
+        overlay = frame.copy()
+
+        if zones.polygons["yellow"]:
+            cv2.fillPoly(overlay, zones.polygons["yellow"], (0, 255, 255))
+
+        if zones.polygons["red"]:
+            cv2.fillPoly(overlay, zones.polygons["red"], (0, 0, 255))
+
+        cv2.addWeighted(overlay, 0.2, frame, 0.8, 0, frame)
+
+        if self.drawing_mode:
+            # Draw points
+            draw_color = (0, 255, 255) if self.current_drawing_zone == 'yellow' else (0, 0,
+                                                                                      255) if self.current_drawing_zone == 'red' else (
+                255, 255, 255)
+
+            # Connect existing points
+            if len(self.drawing_points) > 0:
+                # Draw circles for each point
+                for pt in self.drawing_points:
+                    cv2.circle(frame, pt, 5, draw_color, -1)
+
+                # Draw lines connecting them
+                if len(self.drawing_points) > 1:
+                    pts = np.array(self.drawing_points, np.int32)
+                    pts = pts.reshape((-1, 1, 2))
+                    cv2.polylines(frame, [pts], False, draw_color, 2)
+
+        self.metrics.observe("overlay", time.perf_counter() - t0)
+        return frame
+
+    def get_frame(self):
+        try:
+            t_captured, frame = self.frame_queue.get(timeout=0.1)
+        except:
+            return None
+        age = time.perf_counter() - t_captured
+        self.metrics.observe("queue", age)
+        self.frame_time = time.time() - age
+        return frame
@@ -0,0 +1,215 @@
+import os
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+# ---------------- Defaults ----------------
+RECONNECT_DELAY = 1.0  # first retry delay; doubles up to MAX_RECONNECT_DELAY
+MAX_RECONNECT_DELAY = 10.0
+GOP_SLACK = 10.0  # extra seconds buffered so a keyframe before the pre-roll is still there
+MAX_EVENT = 30.0  # seconds an event can be extended past its start while red persists
+CLIP_EXTENSION = ".avi"  # AVI takes Annex B H.264/H.265 packets without codec private data
+DEFAULT_FPS = 25.0  # when the stream reports none
+JPEG_QUALITY = 95
+ZONE_COLORS = {"yellow": (0, 255, 255), "red": (0, 0, 255)}
+
+
+class EvidenceRecorder:
+    """High-resolution evidence from the main stream while detection runs on the sub-stream.
+
+    The main stream is only demuxed: OpenCV's raw mode (CAP_PROP_FORMAT -1)
+    returns the encoded packets, which are buffered for a few seconds with
+    their arrival time. For an intrusion, the packets from the keyframe before
+    the pre-roll to the end of the post-roll are written to a clip without
+    re-encoding. Only that clip is decoded, up to the frame that arrived
+    closest to the event, and the result replaces the sub-stream snapshot as a
+    full-resolution still. Detection boxes are scaled onto it and zones are
+    compiled for its resolution.
+
+    One event covers one red episode: extend() moves its end while red
+    persists (up to MAX_EVENT), and the clip runs to the end plus the
+    post-roll.
+
+    Both streams are stamped with their arrival time on this host, so frames
+    are matched by time; `offset` corrects a constant lag of the main stream.
+    """
+
+    def __init__(self, url, pre, post, offset=0.0, metrics=None):
+        self.url = url
+        self.pre = pre
+        self.post = post
+        self.offset = offset
+        self.metrics = metrics
+
+        self.packets = deque()  # (arrival time, keyframe, encoded bytes), oldest is always a keyframe
+        self.pending = []  # [path, event time, boxes, frame size, zone set, end time] waiting for their post-roll
+        self.lock = threading.Lock()
+        self.stream = None  # (fourcc, fps, (w, h), extradata) of the current connection
+        self._running = False
+
+    def start(self):
+        self._running = True
+        threading.Thread(target=self._run, name="evidence", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._running = False
+
+    def capture(self, snapshot_path, event_time, boxes, frame_size, zone_set):
+        """Queue evidence for an event seen at event_time (time.time()) on a frame_size sub-stream frame.
+
+        boxes are (x1, y1, x2, y2, color) in sub-stream pixels. The clip is
+        written next to snapshot_path, which is replaced by the high-resolution
+        still once the post-roll has been recorded. Returns the event for extend().
+        """
+        t = event_time + self.offset
+        event = [snapshot_path, t, list(boxes), frame_size, zone_set, t]
+        with self.lock:
+            self.pending.append(event)
+        return event
+
+    def extend(self, event, event_time):
+        """Keep recording `event` up to event_time; False once its clip is being written"""
+        with self.lock:
+            if not any(e is event for e in self.pending):
+                return False
+            event[5] = min(max(event[5], event_time + self.offset), event[1] + MAX_EVENT)
+            return True
+
+    # ---------------- Main stream ----------------
+    def _run(self):
+        delay = RECONNECT_DELAY
+        while self._running:
+            cap = self.open()
+            if cap is None:
+                print(f"[EVIDENCE] Main stream unavailable, retrying in {delay:.0f}s")
+                time.sleep(delay)
+                delay = min(delay * 2, MAX_RECONNECT_DELAY)
+                continue
+            delay = RECONNECT_DELAY
+            w, h = self.stream[2]
+            print(f"[EVIDENCE] Buffering main stream {w}x{h} without decoding")
+            self.read(cap)
+            cap.release()
+            time.sleep(RECONNECT_DELAY)
+
+    def open(self):
+        cap = cv2.VideoCapture(self.url, cv2.CAP_FFMPEG)
+        if not cap.isOpened() or not cap.set(cv2.CAP_PROP_FORMAT, -1):
+            cap.release()
+            return None
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        ok, extradata = cap.retrieve(flag=int(cap.get(cv2.CAP_PROP_CODEC_EXTRADATA_INDEX)))
+        extradata = extradata.tobytes() if ok and extradata is not None else b""
+        with self.lock:
+            # Packets from an earlier connection cannot be joined with this one
+            self.packets.clear()
+            self.stream = (int(cap.get(cv2.CAP_PROP_FOURCC)), fps if 0 < fps <= 120 else DEFAULT_FPS, size, extradata)
+        return cap
+
+    def read(self, cap):
+        packets = self.packets
+        while self._running:
+            if not cap.grab():
+                print("[EVIDENCE] Main stream lost, reconnecting")
+                return
+            now = time.time()
+            ok, data = cap.retrieve()
+            if not ok or data is None:
+                continue
+            key = bool(cap.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME))
+
+            with self.lock:
+                packets.append((now, key, data.tobytes()))
+                # Keep the pre-roll of every pending event, however long it has been extended
+                horizon = min([now - self.post] + [e[1] for e in self.pending]) - self.pre - GOP_SLACK
+                while packets and (packets[0][0] < horizon or not packets[0][1]):
+                    packets.popleft()
+                ready = [e for e in self.pending if e[5] + self.post <= now]
+                if ready:
+                    self.pending = [e for e in self.pending if e[5] + self.post > now]
+                    snapshot = list(packets)
+            for event in ready:
+                threading.Thread(target=self.save, args=(event, snapshot, self.stream), daemon=True).start()
+
+    # ---------------- Evidence ----------------
+    def save(self, event, packets, stream):
+        path, t, boxes, frame_size, zone_set, end = event
+        try:
+            clip = self.select(packets, t, end)
+            if clip is None:
+                raise ValueError("no main-stream keyframe before the event")
+            packets, target = clip
+            clip_path = os.path.splitext(path)[0] + CLIP_EXTENSION
+            self.write_clip(clip_path, packets, stream)
+            frame = self.decode(clip_path, target)
+            self.annotate(frame, boxes, frame_size, zone_set)
+            tmp = path + ".tmp.jpg"
+            if not cv2.imwrite(tmp, frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY]):
+                raise OSError(f"could not write {tmp}")
+            os.replace(tmp, path)
+            self._count("evidence_saved")
+            print(f"[EVIDENCE] {frame.shape[1]}x{frame.shape[0]} still and {len(packets)}-frame clip for {path}")
+        except (OSError, ValueError, cv2.error) as e:
+            self._count("evidence_failed")
+            print(f"[EVIDENCE] Keeping the sub-stream snapshot for {path}: {e}")
+
+    def select(self, packets, t, end):
+        """Packets from the keyframe before the pre-roll to the post-roll after `end`, and the event frame's index"""
+        start = None
+        for i, (arrival, key, _) in enumerate(packets):
+            if arrival > t:
+                break
+            if key and (start is None or arrival <= t - self.pre):
+                start = i
+        if start is None:
+            return None
+        clip = [p for p in packets[start:] if p[0] <= end + self.post]
+        target = min(range(len(clip)), key=lambda i: abs(clip[i][0] - t))
+        return clip, target
+
+    def write_clip(self, path, packets, stream):
+        fourcc, fps, size, extradata = stream
+        writer = cv2.VideoWriter(path, cv2.CAP_FFMPEG, fourcc, fps, size, [cv2.VIDEOWRITER_PROP_RAW_VIDEO, 1])
+        if not writer.isOpened():
+            raise OSError(f"could not open {path} for stream copy")
+        try:
+            for i, (_, _, data) in enumerate(packets):
+                # Parameter sets first, for cameras that send them only out of band
+                writer.write(np.frombuffer(extradata + data if i == 0 else data, dtype=np.uint8))
+        finally:
+            writer.release()
+
+    def decode(self, path, target):
+        cap = cv2.VideoCapture(path, cv2.CAP_FFMPEG)
+        try:
+            for _ in range(target):
+                if not cap.grab():
+                    break
+            ret, frame = cap.read()
+        finally:
+            cap.release()
+        if not ret:
+            raise ValueError(f"could not decode frame {target} of {path}")
+        return frame
+
+    def annotate(self, frame, boxes, frame_size, zone_set):
+        """Zones compiled at this resolution; boxes scaled from sub-stream pixels"""
+        h, w = frame.shape[:2]
+        sx, sy = w / frame_size[0], h / frame_size[1]
+        zones = zone_set.compile(w, h)
+        for severity, color in ZONE_COLORS.items():
+            if zones.polygons[severity]:
+                cv2.polylines(frame, zones.polygons[severity], True, color, 2)
+        thickness = max(2, int(round(2 * sx)))
+        for x1, y1, x2, y2, color in boxes:
+            cv2.rectangle(frame, (int(x1 * sx), int(y1 * sy)), (int(x2 * sx), int(y2 * sy)), color, thickness)
+        return frame
+
+    def _count(self, name):
+        if self.metrics is not None:
+            self.metrics.inc(name)
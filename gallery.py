@@ -0,0 +1,299 @@
+import os
+import queue
+import re
+import threading
+from collections import OrderedDict
+
+import customtkinter as ctk
+import tkinter as tk
+import cv2
+import numpy as np
+from PIL import Image, ImageTk
+
+# ---------------- Defaults ----------------
+THUMB_SIZE = (192, 108)
+THUMB_DIR = ".thumbs"  # inside the browsed folder
+MEMORY_ITEMS = 600  # decoded thumbnails kept as Tk images
+WORKERS = 2
+CELL_PAD = 8
+LABEL_HEIGHT = 18
+POLL_MS = 30
+RESULTS_PER_POLL = 40  # PhotoImages created per Tk tick, so a burst never stalls the UI
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+TIMESTAMP = re.compile(r"(\d{4})(\d{2})(\d{2})_(\d{2})(\d{2})(\d{2})")
+
+
+def event_label(name):
+    """'intrusion_20240101_120000.jpg' -> '2024-01-01 12:00:00'"""
+    m = TIMESTAMP.search(name)
+    if not m:
+        return name
+    y, mo, d, h, mi, s = m.groups()
+    return f"{y}-{mo}-{d} {h}:{mi}:{s}"
+
+
+class ThumbnailLoader:
+    """Decodes thumbnails on a small worker pool, through an on-disk thumbnail cache.
+
+    The most recent request is served first (LIFO), and ones that scrolled
+    out of view are dropped when dequeued. JPEGs are decoded at 1/4 scale by
+    libjpeg itself, so a full-size image is never materialized. Results are
+    PIL images on self.results; Tk images are made by the caller on its own
+    thread.
+    """
+
+    def __init__(self, cache_dir, size=THUMB_SIZE, workers=WORKERS):
+        self.cache_dir = cache_dir
+        self.size = size
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self.requests = queue.LifoQueue()
+        self.results = queue.Queue()
+        self.pending = set()
+        self.wanted = frozenset()
+        self._running = True
+        for i in range(workers):
+            threading.Thread(target=self._run, name=f"thumbs-{i}", daemon=True).start()
+
+    def request(self, path):
+        if path not in self.pending:
+            self.pending.add(path)
+            self.requests.put(path)
+
+    def set_wanted(self, paths):
+        self.wanted = frozenset(paths)
+
+    def stop(self):
+        self._running = False
+
+    def _run(self):
+        while self._running:
+            try:
+                path = self.requests.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if path not in self.wanted:
+                self.pending.discard(path)
+                continue
+            try:
+                image = self.load(path)
+            except (OSError, cv2.error, ValueError) as e:
+                print(f"[GALLERY] Could not load {path}: {e}")
+                image = None
+            self.results.put((path, image))
+
+    def load(self, path):
+        cached = os.path.join(self.cache_dir, os.path.splitext(os.path.basename(path))[0] + ".jpg")
+        try:
+            if os.path.getmtime(cached) >= os.path.getmtime(path):
+                return Image.open(cached).convert("RGB")
+        except OSError:
+            pass
+
+        data = np.fromfile(path, dtype=np.uint8)  # fromfile + imdecode copes with non-ASCII Windows paths
+        im = cv2.imdecode(data, cv2.IMREAD_REDUCED_COLOR_4)
+        if im is None:
+            return None
+        h, w = im.shape[:2]
+        scale = min(self.size[0] / w, self.size[1] / h, 1.0)
+        im = cv2.resize(im, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+        cv2.imwrite(cached, im, [cv2.IMWRITE_JPEG_QUALITY, 85])
+        return Image.fromarray(cv2.cvtColor(im, cv2.COLOR_BGR2RGB))
+
+
+class ReviewPanel(ctk.CTkToplevel):
+    """Intrusion snapshots as a virtualized thumbnail grid, newest first.
+
+    Only the cells on screen exist as canvas items; scrolling reassigns them
+    instead of creating widgets, so the cost is the same for 100 or 100k
+    images. Thumbnails missing from the in-memory LRU are requested from the
+    ThumbnailLoader, together with one screen of look-ahead.
+    """
+
+    def __init__(self, master, folder, memory_items=MEMORY_ITEMS):
+        super().__init__(master)
+        self.title("Intrusion Review")
+        self.geometry("1100x700")
+        self.folder = folder
+        self.memory_items = memory_items
+        self.loader = ThumbnailLoader(os.path.join(folder, THUMB_DIR))
+
+        self.files = []
+        self.cache = OrderedDict()  # path -> PhotoImage, least recently used first
+        self.slots = []  # (frame rect, image, label) canvas items, reused while scrolling
+        self.top_row = 0.0
+        self.cols = 1
+        self.cell_w = THUMB_SIZE[0] + CELL_PAD
+        self.cell_h = THUMB_SIZE[1] + LABEL_HEIGHT + CELL_PAD
+        self.placeholder = ImageTk.PhotoImage(Image.new("RGB", THUMB_SIZE, (40, 40, 40)))
+        self.visible = []
+        self._scanned = None
+        self._closed = False
+
+        self.setup_ui()
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        self.refresh()
+        self.poll()
+
+    def setup_ui(self):
+        header = ctk.CTkFrame(self)
+        header.pack(fill="x", padx=10, pady=(10, 0))
+        self.lbl_count = ctk.CTkLabel(header, text="Loading...", font=("Arial", 14, "bold"))
+        self.lbl_count.pack(side="left", padx=10)
+        ctk.CTkButton(header, text="🔄 REFRESH", command=self.refresh, width=120,
+                      fg_color="gray", hover_color="#5d5d5d", font=("Arial", 12, "bold")).pack(side="right", padx=10)
+
+        body = tk.Frame(self, bg="#1e1e1e")
+        body.pack(fill="both", expand=True, padx=10, pady=10)
+        self.scrollbar = tk.Scrollbar(body, orient="vertical", command=self.on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        self.canvas = tk.Canvas(body, bg="#1e1e1e", highlightthickness=0)
+        self.canvas.pack(side="left", fill="both", expand=True)
+
+        self.canvas.bind("<Configure>", lambda e: self.render())
+        self.canvas.bind("<MouseWheel>", lambda e: self.scroll_rows(-e.delta / 120))
+        self.canvas.bind("<Button-4>", lambda e: self.scroll_rows(-1))
+        self.canvas.bind("<Button-5>", lambda e: self.scroll_rows(1))
+        self.canvas.bind("<ButtonRelease-1>", self.on_click)
+
+    # ---------------- Listing ----------------
+    def refresh(self):
+        def scan():
+            try:
+                names = [e.name for e in os.scandir(self.folder)
+                         if e.name.lower().endswith(IMAGE_EXTENSIONS) and e.is_file()]
+            except OSError as ex:
+                print(f"[GALLERY] Could not list {self.folder}: {ex}")
+                names = []
+            # Names carry the timestamp, so reverse name order is newest first
+            names.sort(reverse=True)
+            self._scanned = [os.path.join(self.folder, n) for n in names]  # picked up by poll() on the Tk thread
+        threading.Thread(target=scan, daemon=True).start()
+
+    def set_files(self, files):
+        self.files = files
+        self.lbl_count.configure(text=f"{len(files)} intrusion snapshot(s)")
+        self.top_row = 0.0
+        self.render()
+
+    # ---------------- Virtual scrolling ----------------
+    def total_rows(self):
+        return -(-len(self.files) // self.cols)
+
+    def visible_rows(self):
+        return max(1, self.canvas.winfo_height() // self.cell_h)
+
+    def max_top(self):
+        return max(0.0, self.total_rows() - self.visible_rows())
+
+    def scroll_rows(self, rows):
+        self.top_row = min(max(0.0, self.top_row + rows), self.max_top())
+        self.render()
+
+    def on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self.top_row = min(max(0.0, float(value) * self.total_rows()), self.max_top())
+            self.render()
+        elif action == "scroll":
+            step = self.visible_rows() if unit == "pages" else 1
+            self.scroll_rows(int(value) * step)
+
+    def render(self):
+        width = max(1, self.canvas.winfo_width())
+        self.cols = max(1, width // self.cell_w)
+        first_row = int(self.top_row)
+        offset = (self.top_row - first_row) * self.cell_h
+        rows_on_screen = self.visible_rows() + 2
+        start = first_row * self.cols
+        visible = self.files[start:start + rows_on_screen * self.cols]
+
+        while len(self.slots) < len(visible):
+            self.slots.append((
+                self.canvas.create_rectangle(0, 0, 0, 0, outline="#444444"),
+                self.canvas.create_image(0, 0, anchor="nw", image=self.placeholder),
+                self.canvas.create_text(0, 0, anchor="nw", fill="#cccccc", font=("Arial", 9)),
+            ))
+
+        for i, (rect, img, text) in enumerate(self.slots):
+            if i >= len(visible):
+                for item in (rect, img, text):
+                    self.canvas.itemconfigure(item, state="hidden")
+                continue
+            path = visible[i]
+            x = (i % self.cols) * self.cell_w + CELL_PAD // 2
+            y = (i // self.cols) * self.cell_h + CELL_PAD // 2 - offset
+            photo = self.cache.get(path)
+            if photo is not None:
+                self.cache.move_to_end(path)
+            else:
+                self.loader.request(path)
+            self.canvas.coords(rect, x - 1, y - 1, x + THUMB_SIZE[0] + 1, y + THUMB_SIZE[1] + 1)
+            self.canvas.coords(img, x, y)
+            self.canvas.coords(text, x, y + THUMB_SIZE[1] + 2)
+            self.canvas.itemconfigure(img, image=photo or self.placeholder, state="normal")
+            self.canvas.itemconfigure(text, text=event_label(os.path.basename(path)), state="normal")
+            self.canvas.itemconfigure(rect, state="normal")
+
+        # Keep what is on screen plus one screen ahead; everything else is dropped by the workers
+        ahead = self.files[start + len(visible):start + 2 * len(visible)]
+        self.loader.set_wanted(visible + ahead)
+        for path in ahead:
+            if path not in self.cache:
+                self.loader.request(path)
+
+        total = self.total_rows()
+        if total:
+            self.scrollbar.set(self.top_row / total, min(1.0, (self.top_row + self.visible_rows()) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        self.visible = visible
+
+    def poll(self):
+        if self._closed:
+            return
+        if self._scanned is not None:
+            files, self._scanned = self._scanned, None
+            self.set_files(files)
+        changed = False
+        for _ in range(RESULTS_PER_POLL):
+            try:
+                path, image = self.loader.results.get_nowait()
+            except queue.Empty:
+                break
+            self.loader.pending.discard(path)
+            if image is None:
+                continue
+            self.cache[path] = ImageTk.PhotoImage(image)
+            if len(self.cache) > self.memory_items:
+                self.cache.popitem(last=False)
+            changed = changed or path in self.visible
+        if changed:
+            self.render()
+        self.after(POLL_MS, self.poll)
+
+    # ---------------- Viewer ----------------
+    def on_click(self, event):
+        col = event.x // self.cell_w
+        row = int((event.y + (self.top_row - int(self.top_row)) * self.cell_h) // self.cell_h)
+        index = (int(self.top_row) + row) * self.cols + col
+        if col < self.cols and 0 <= index < len(self.files):
+            self.open_image(self.files[index])
+
+    def open_image(self, path):
+        im = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if im is None:
+            return
+        h, w = im.shape[:2]
+        scale = min(1000 / w, 700 / h, 1.0)
+        im = cv2.resize(im, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+        window = ctk.CTkToplevel(self)
+        window.title(event_label(os.path.basename(path)))
+        photo = ImageTk.PhotoImage(Image.fromarray(cv2.cvtColor(im, cv2.COLOR_BGR2RGB)))
+        label = tk.Label(window, image=photo, bg="black")
+        label.image = photo
+        label.pack()
+
+    def close(self):
+        self._closed = True
+        self.loader.stop()
+        self.destroy()
@@ -0,0 +1,190 @@
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+# ---------------- Defaults ----------------
+OUT_DIR = "hard_examples"
+QUEUE_SIZE = 4  # frames waiting for the writer; more are dropped, never waited on
+INDEX_SIZE = 20000  # hashes kept for dedup per day
+JPEG_QUALITY = 92
+
+
+def dhash(frame):
+    """64-bit difference hash: brightness gradients of a 9x8 grayscale thumbnail"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+class HashIndex:
+    """Recent perceptual hashes; a frame within max_distance bits of one is a near-duplicate"""
+
+    def __init__(self, max_distance, size=INDEX_SIZE):
+        self.max_distance = max_distance
+        self.size = size
+        self.hashes = np.zeros(size, dtype=np.uint64)
+        self.count = 0
+
+    def nearest(self, h):
+        n = min(self.count, self.size)
+        if not n:
+            return 64
+        xor = self.hashes[:n] ^ np.uint64(h)
+        return int(np.unpackbits(xor.view(np.uint8).reshape(n, 8), axis=1).sum(axis=1).min())
+
+    def is_duplicate(self, h):
+        return self.nearest(h) <= self.max_distance
+
+    def add(self, h):
+        self.hashes[self.count % self.size] = h
+        self.count += 1
+
+
+class HardExampleMiner:
+    """Saves frames the model is unsure about, with YOLO pseudo-labels, for retraining.
+
+    The detection thread only calls submit(), which checks the confidence band
+    and hands the frame to a writer thread through a small queue (dropping when
+    it is full). The writer skips near-duplicates by dHash and stops for the
+    day once the day's directory reaches daily_mb.
+
+    Layout: <out_dir>/<YYYY-MM-DD>/images/*.jpg, labels/*.txt (class cx cy w h,
+    normalized) and index.txt (hex hashes, reloaded after a restart).
+    """
+
+    def __init__(self, band, daily_mb, hash_distance, label_conf=None, metrics=None, out_dir=OUT_DIR):
+        self.low, self.high = band
+        self.daily_bytes = int(daily_mb * 1024 * 1024)
+        self.label_conf = self.low if label_conf is None else label_conf
+        self.metrics = metrics
+        self.out_dir = out_dir
+
+        self.index = HashIndex(hash_distance)
+        self.day = None
+        self.day_bytes = 0
+        self.saved = 0
+        self.duplicates = 0
+        self.dropped = 0
+        self._full_logged = False
+
+        self.queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self._running = False
+
+    # ---------------- Detection thread ----------------
+    def is_uncertain(self, det, names):
+        for conf, cls_id in zip(det.conf, det.cls):
+            name = names[int(cls_id)].lower()
+            if ("hand" in name or "glove" in name) and self.low <= conf < self.high:
+                return True
+        return False
+
+    def submit(self, frame, det, names):
+        """Queue a copy of the frame if any hand/glove score is in the band; never blocks"""
+        if not self.is_uncertain(det, names):
+            return False
+        # Checked before copying so a busy writer costs nothing here; submit() is the only producer
+        if self.queue.full():
+            self.dropped += 1
+            self._count("hard_examples_dropped")
+            return False
+        self.queue.put_nowait((frame.copy(), det, time.time()))
+        return True
+
+    # ---------------- Writer thread ----------------
+    def start(self):
+        self._running = True
+        threading.Thread(target=self._run, name="hard-examples", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._running = False
+
+    def _run(self):
+        while self._running:
+            try:
+                frame, det, ts = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                self.save(frame, det, ts)
+            except (OSError, cv2.error) as e:
+                print(f"[MINER] Could not save hard example: {e}")
+
+    def _day_dir(self, day):
+        return os.path.join(self.out_dir, day)
+
+    def _roll_day(self, day):
+        """Switch to a new day: reload its hash index and bytes already written"""
+        self.day = day
+        self.day_bytes = 0
+        self._full_logged = False
+        self.index = HashIndex(self.index.max_distance, self.index.size)
+        day_dir = self._day_dir(day)
+        for sub in ("images", "labels"):
+            os.makedirs(os.path.join(day_dir, sub), exist_ok=True)
+            for entry in os.scandir(os.path.join(day_dir, sub)):
+                self.day_bytes += entry.stat().st_size
+        index_path = os.path.join(day_dir, "index.txt")
+        if os.path.exists(index_path):
+            with open(index_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self.index.add(int(line, 16))
+
+    def save(self, frame, det, ts):
+        day = datetime.fromtimestamp(ts).strftime("%Y-%m-%d")
+        if day != self.day:
+            self._roll_day(day)
+
+        if self.day_bytes >= self.daily_bytes:
+            if not self._full_logged:
+                self._full_logged = True
+                print(f"[MINER] Daily budget of {self.daily_bytes // (1024 * 1024)} MB reached for {day}")
+            return None
+
+        h = dhash(frame)
+        if self.index.is_duplicate(h):
+            self.duplicates += 1
+            self._count("hard_examples_duplicate")
+            return None
+
+        ok, jpg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+        if not ok:
+            return None
+        labels = self.pseudo_labels(det, frame.shape[1], frame.shape[0])
+
+        day_dir = self._day_dir(day)
+        stem = f"{datetime.fromtimestamp(ts).strftime('%H%M%S_%f')}_{h:016x}"
+        with open(os.path.join(day_dir, "images", stem + ".jpg"), "wb") as f:
+            f.write(jpg.tobytes())
+        with open(os.path.join(day_dir, "labels", stem + ".txt"), "w", encoding="utf-8") as f:
+            f.write(labels)
+        with open(os.path.join(day_dir, "index.txt"), "a", encoding="utf-8") as f:
+            f.write(f"{h:016x}\n")
+
+        self.index.add(h)
+        self.day_bytes += len(jpg) + len(labels)
+        self.saved += 1
+        self._count("hard_examples_saved")
+        return stem
+
+    def pseudo_labels(self, det, w, h):
+        """YOLO label lines for every box at or above label_conf"""
+        lines = []
+        for (x1, y1, x2, y2), conf, cls_id in zip(det.xyxy, det.conf, det.cls):
+            if conf < self.label_conf:
+                continue
+            cx, cy = (x1 + x2) / 2 / w, (y1 + y2) / 2 / h
+            bw, bh = (x2 - x1) / w, (y2 - y1) / h
+            lines.append(f"{int(cls_id)} {cx:.6f} {cy:.6f} {bw:.6f} {bh:.6f}\n")
+        return "".join(lines)
+
+    def _count(self, name):
+        if self.metrics is not None:
+            self.metrics.inc(name)
@@ -0,0 +1,159 @@
+"""Headless detection service for edge nodes: no window, no GUI toolkit.
+
+Runs the shared HandDetector on the configured camera and reconnects with
+backoff when the camera drops. Settings are hot-reloaded and metrics are
+served on localhost. Under systemd (deploy/hand-detector.service) it reports
+readiness and pings the service watchdog from the main loop.
+
+A red stop stays latched (latch_red) until the operator resets it after
+clearing the press: SIGUSR1 (systemctl kill -s USR1 hand-detector) or GET
+/reset on the metrics port. A watchdog fail-safe stop is released when the
+pipeline recovers. A detection error is logged and the frame skipped; if
+errors persist, the stall watchdog stops the machine.
+
+    python headless.py [--metrics-port 9108]
+    curl http://127.0.0.1:9108/reset
+"""
+import argparse
+import os
+import signal
+import socket
+import threading
+import time
+
+from config import ConfigWatcher
+from detector import HandDetector
+from metrics import MetricsServer, METRICS_PORT
+
+# ---------------- Defaults ----------------
+RECONNECT_DELAY = 1.0  # first retry delay; doubles up to MAX_RECONNECT_DELAY
+MAX_RECONNECT_DELAY = 10.0  # stays well inside the unit's WatchdogSec
+NO_FRAME_RECONNECT = 5.0  # seconds without frames before the capture is reopened
+NOTIFY_INTERVAL = 1.0
+
+
+def sd_notify(message):
+    """systemd notification (READY=1, WATCHDOG=1, STOPPING=1); no-op outside systemd"""
+    address = os.environ.get("NOTIFY_SOCKET")
+    if not address or not hasattr(socket, "AF_UNIX"):
+        return
+    if address.startswith("@"):
+        address = "\0" + address[1:]  # abstract namespace
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.connect(address)
+            sock.sendall(message.encode())
+    except OSError:
+        pass
+
+
+class HeadlessService:
+    def __init__(self, metrics_port=METRICS_PORT):
+        self.config_watcher = ConfigWatcher()
+        self.detector = HandDetector(self.config_watcher.settings)
+        self.detector.detection_enabled = self.detector.has_zones()
+        self.config_watcher.subscribe(self.detector.apply_settings)
+        self.config_watcher.subscribe(self.on_settings_changed)
+
+        self.metrics_port = metrics_port
+        self.metrics_server = None
+        self.stop_event = threading.Event()
+        self.reset_requested = threading.Event()  # applied on the detection thread
+        self.last_notify = 0.0
+
+    def on_settings_changed(self, old, new, changed):
+        enabled = self.detector.has_zones()
+        if enabled != self.detector.detection_enabled:
+            print(f"[CONFIG] Detection {'enabled' if enabled else 'disabled: no zones for this camera'}")
+        self.detector.detection_enabled = enabled
+
+    def notify_alive(self):
+        now = time.monotonic()
+        if now - self.last_notify >= NOTIFY_INTERVAL:
+            self.last_notify = now
+            sd_notify("WATCHDOG=1")
+
+    def connect(self):
+        delay = RECONNECT_DELAY
+        while not self.stop_event.is_set():
+            if self.detector.start_capture():
+                print("[INFO] Camera connected")
+                return True
+            print(f"[ERROR] Camera unavailable, retrying in {delay:.0f}s")
+            self.notify_alive()
+            self.stop_event.wait(delay)
+            delay = min(delay * 2, MAX_RECONNECT_DELAY)
+        return False
+
+    def run(self):
+        if self.metrics_port:
+            try:
+                self.metrics_server = MetricsServer(self.detector.metrics, port=self.metrics_port)
+                self.metrics_server.add_route("/reset", self.reset_route)
+                self.metrics_server.start()
+                print(f"[INFO] Metrics at http://{self.metrics_server.host}:{self.metrics_server.port}/metrics")
+            except OSError as e:
+                print(f"[WARNING] Metrics endpoint unavailable: {e}")
+        self.config_watcher.start()
+        if not self.detector.detection_enabled:
+            print("[WARNING] No zones configured for this camera; detection stays off until zones are saved")
+
+        sd_notify("READY=1")
+        if self.connect():
+            self.loop()
+
+        sd_notify("STOPPING=1")
+        print("[INFO] Shutting down")
+        self.config_watcher.stop()
+        self.detector.stop_capture()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+
+    def loop(self):
+        detector = self.detector
+        last_frame = time.monotonic()
+        while not self.stop_event.is_set():
+            self.notify_alive()
+            if self.reset_requested.is_set():
+                self.reset_requested.clear()
+                print("[INFO] Stop latch reset" if detector.reset_latch() else "[INFO] No stop latched")
+            frame = detector.get_frame()
+            now = time.monotonic()
+            if frame is None:
+                if now - last_frame > NO_FRAME_RECONNECT:
+                    print(f"[WARNING] No frames for {now - last_frame:.0f}s, reconnecting camera")
+                    detector.stop_capture()
+                    if not self.connect():
+                        return
+                    last_frame = time.monotonic()
+                continue
+            last_frame = now
+            if detector.detection_enabled:
+                try:
+                    detector.process_frame(frame)
+                except Exception as e:
+                    detector.metrics.inc("detection_errors")
+                    print(f"[ERROR] Detection failed, frame skipped: {type(e).__name__}: {e}")
+
+    def stop(self, *args):
+        self.stop_event.set()
+
+    def request_reset(self, *args):
+        self.reset_requested.set()
+
+    def reset_route(self, query):
+        self.request_reset()
+        return 202, "text/plain", "latch reset requested\n"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless hand detection service")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT, help="0 disables the metrics endpoint")
+    args = parser.parse_args()
+
+    service = HeadlessService(args.metrics_port)
+    signal.signal(signal.SIGTERM, service.stop)
+    signal.signal(signal.SIGINT, service.stop)
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, service.request_reset)
+    service.run()
@@ -0,0 +1,158 @@
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+# ---------------- Defaults ----------------
+RECONNECT_DELAY = 1.0  # first model server reconnect delay; doubles up to MAX_RECONNECT_DELAY
+MAX_RECONNECT_DELAY = 30.0
+
+# Boxes for one frame as plain arrays: xyxy (N, 4) float32, conf (N,), cls (N,)
+Detections = namedtuple("Detections", ["xyxy", "conf", "cls"])
+
+
+def empty_detections():
+    return Detections(np.empty((0, 4), np.float32), np.empty(0, np.float32), np.empty(0, np.float32))
+
+
+class LocalModel:
+    """YOLO weights loaded into this process; fast=True adds the verified single-frame fast path"""
+
+    def __init__(self, path, fast=False):
+        # Imported here so processes using the model server never load torch
+        from ultralytics import YOLO
+        self.path = path
+        self.model = YOLO(path)
+        self.names = self.model.names
+        self.fast = None
+        if fast:
+            from fast_path import FastPath
+            self.fast = FastPath(self.model, self.predict_stock)
+
+    def predict(self, frame, conf, imgsz):
+        if self.fast is not None:
+            return self.fast.predict(frame, conf, imgsz)
+        return self.predict_stock(frame, conf, imgsz)
+
+    def predict_stock(self, frame, conf, imgsz):
+        return self.predict_batch([frame], conf, imgsz)[0]
+
+    def pause_verification(self, paused):
+        """Stop comparing the fast path with the stock path (inference runs twice) while overloaded"""
+        if self.fast is not None:
+            self.fast.paused = paused
+
+    def predict_batch(self, frames, conf, imgsz):
+        results = self.model(frames, verbose=False, conf=conf, imgsz=imgsz)
+        return [Detections(r.boxes.xyxy.cpu().numpy(), r.boxes.conf.cpu().numpy(), r.boxes.cls.cpu().numpy())
+                for r in results]
+
+    def close(self):
+        pass
+
+
+class FailoverModel:
+    """Model server client that falls back to local weights while the server is unusable.
+
+    Any client error (timeout, server-side error, broken connection) drops
+    the connection and loads the local weights on a background thread;
+    frames are answered locally once they are loaded and raise until then.
+    The server is retried with exponential backoff, and the local weights
+    are released again when it is back.
+    """
+
+    def __init__(self, settings, client=None):
+        self.settings = settings
+        self.client = client
+        self.local = None
+        self.loading = False
+        self.lock = threading.Lock()
+        self.delay = RECONNECT_DELAY
+        self.retry_at = 0.0
+        self.paused = False
+        if client is None:
+            self.local = LocalModel(settings.resolved_model_path(), fast=settings.fast_path)
+            self.retry_at = time.monotonic() + self.delay
+        self.names = (client or self.local).names
+
+    def predict(self, frame, conf, imgsz):
+        if self.client is None and time.monotonic() >= self.retry_at:
+            self._reconnect()
+        client = self.client
+        if client is not None:
+            try:
+                det = client.predict(frame, conf, imgsz)
+                self.delay = RECONNECT_DELAY
+                return det
+            except (TimeoutError, RuntimeError, EOFError, OSError) as e:
+                self._client_failed(e)
+        local = self.local
+        if local is None:
+            raise RuntimeError("model server unavailable and local weights still loading")
+        return local.predict(frame, conf, imgsz)
+
+    def _client_failed(self, error):
+        print(f"[WARNING] Model server {self.settings.model_server} failed ({error}), "
+              f"using local weights; retrying in {self.delay:g}s")
+        client, self.client = self.client, None
+        if client is not None:
+            try:
+                client.close()
+            except (OSError, EOFError):
+                pass
+        self.retry_at = time.monotonic() + self.delay
+        self.delay = min(self.delay * 2, MAX_RECONNECT_DELAY)
+        with self.lock:
+            if self.local is not None or self.loading:
+                return
+            self.loading = True
+        threading.Thread(target=self._load_local, daemon=True).start()
+
+    def _load_local(self):
+        try:
+            local = LocalModel(self.settings.resolved_model_path(), fast=self.settings.fast_path)
+            local.pause_verification(self.paused)
+            self.local = local
+            print("[INFO] Local weights loaded while the model server is unavailable")
+        except Exception as e:
+            print(f"[ERROR] Could not load local weights: {e}")
+        finally:
+            self.loading = False
+
+    def _reconnect(self):
+        from model_server import ModelClient
+        try:
+            self.client = ModelClient(self.settings.model_server)
+        except (OSError, EOFError):
+            self.retry_at = time.monotonic() + self.delay
+            self.delay = min(self.delay * 2, MAX_RECONNECT_DELAY)
+            return
+        print(f"[INFO] Model server {self.settings.model_server} is back, releasing local weights")
+        local, self.local = self.local, None
+        if local is not None:
+            local.close()
+
+    def pause_verification(self, paused):
+        self.paused = paused
+        if self.local is not None:
+            self.local.pause_verification(paused)
+
+    def close(self):
+        for model in (self.client, self.local):
+            if model is not None:
+                model.close()
+
+
+def load_model(settings):
+    """Connect to the shared model server if configured, else load the weights locally"""
+    if settings.model_server:
+        from model_server import ModelClient
+        try:
+            client = ModelClient(settings.model_server)
+            print(f"[INFO] Using model server at {settings.model_server}")
+        except (OSError, EOFError) as e:
+            print(f"[WARNING] Model server {settings.model_server} unavailable ({e}), loading weights locally")
+            client = None
+        return FailoverModel(settings, client)
+    return LocalModel(settings.resolved_model_path(), fast=settings.fast_path)
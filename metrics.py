@@ -0,0 +1,279 @@
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+
+# ---------------- Defaults ----------------
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9108
+LATENCY_WINDOW = 300  # samples kept per stage for percentiles
+FPS_WINDOW = 2.0  # seconds of ticks used for fps
+QUANTILES = (0.5, 0.95, 0.99)
+
+STAGES = ("capture", "queue", "inference", "postprocess", "overlay", "render", "frame")
+
+
+COUNTERS = (
+    "frames_captured", "frames_dropped", "capture_failures", "detection_errors", "inference_errors",
+    "frames_displayed", "frames_inferred", "degradation_changes", "zone_actuations", "watchdog_stops",
+    "zone_retriggers_suppressed", "zone_flicker_filtered", "hard_examples_saved", "hard_examples_duplicate",
+    "hard_examples_dropped", "evidence_saved", "evidence_failed",
+)
+STREAMS = ("capture", "display")
+
+
+def _copy(container, kind=list):
+    # Copying fails if the writer thread mutates it mid-copy; just retry
+    while True:
+        try:
+            return kind(container)
+        except RuntimeError:
+            continue
+
+
+class _Shard:
+    """One thread's metrics; only that thread writes to it, so no locks"""
+
+    def __init__(self, window, thread=None):
+        self.thread = thread
+        self.latency = {stage: deque(maxlen=window) for stage in STAGES}  # (monotonic time, seconds)
+        self.latency_sum = dict.fromkeys(STAGES, 0.0)
+        self.latency_count = dict.fromkeys(STAGES, 0)
+        self.counters = dict.fromkeys(COUNTERS, 0)  # fixed keys: readers never see the dict resize
+        self.ticks = {stream: deque(maxlen=512) for stream in STREAMS}
+
+
+class PipelineMetrics:
+    """Per-stage latency, fps and counters for the detection pipeline.
+
+    Written from several threads (capture, detection, watchdog, degradation,
+    miner, evidence writers). Each writer thread records into its own shard,
+    so the hot path takes no locks and every shard has a single writer;
+    readers merge the shards. Shards of finished threads are folded into
+    one when a new thread registers.
+    """
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.started = time.monotonic()
+        self.window = window
+        self.gauges = {}  # one writer per gauge
+        self._local = threading.local()
+        self._register_lock = threading.Lock()
+        self._shards = []  # replaced, never mutated, so readers can iterate it freely
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = self._register()
+        return shard
+
+    def _register(self):
+        shard = _Shard(self.window, threading.current_thread())
+        with self._register_lock:
+            live = [s for s in self._shards if s.thread is None or s.thread.is_alive()]
+            dead = [s for s in self._shards if s not in live]
+            if dead:
+                retired = [s for s in live if s.thread is None]
+                live = [s for s in live if s.thread is not None]
+                live.insert(0, self._fold(retired + dead))
+            self._shards = live + [shard]
+        return shard
+
+    def _fold(self, shards):
+        """One writer-less shard with the totals and newest samples of `shards`"""
+        folded = _Shard(self.window)
+        for s in shards:
+            for stage in STAGES:
+                folded.latency_sum[stage] += s.latency_sum[stage]
+                folded.latency_count[stage] += s.latency_count[stage]
+            for name in COUNTERS:
+                folded.counters[name] += s.counters[name]
+        for stage in STAGES:
+            folded.latency[stage].extend(sorted(x for s in shards for x in s.latency[stage]))
+        for stream in STREAMS:
+            folded.ticks[stream].extend(sorted(t for s in shards for t in s.ticks[stream]))
+        return folded
+
+    # ---------------- Recording (hot path) ----------------
+    def observe(self, stage, seconds):
+        shard = self._shard()
+        shard.latency[stage].append((time.monotonic(), seconds))
+        shard.latency_sum[stage] += seconds
+        shard.latency_count[stage] += 1
+
+    def inc(self, name, n=1):
+        self._shard().counters[name] += n
+
+    def tick(self, stream):
+        self._shard().ticks[stream].append(time.monotonic())
+
+    # ---------------- Reading ----------------
+    @property
+    def counters(self):
+        """Merged snapshot of every counter"""
+        return {name: self.count(name) for name in COUNTERS}
+
+    @property
+    def latency_count(self):
+        return {stage: sum(s.latency_count[stage] for s in self._shards) for stage in STAGES}
+
+    @property
+    def latency_sum(self):
+        return {stage: sum(s.latency_sum[stage] for s in self._shards) for stage in STAGES}
+
+    def count(self, name):
+        return sum(s.counters[name] for s in self._shards)
+
+    def samples(self, stage):
+        """Latency samples of all threads, oldest first, newest `window` only"""
+        windows = [w for w in (_copy(s.latency[stage]) for s in self._shards) if w]
+        if len(windows) == 1:
+            merged = windows[0]
+        else:
+            merged = sorted(x for w in windows for x in w)[-self.window:]
+        return [seconds for _, seconds in merged]
+
+    def latest(self, stage):
+        newest = [w[-1] for w in (_copy(s.latency[stage]) for s in self._shards) if w]
+        return max(newest)[1] if newest else None
+
+    def fps(self, stream):
+        now = time.monotonic()
+        ticks = sorted(t for s in self._shards for t in _copy(s.ticks[stream]) if now - t <= FPS_WINDOW)
+        if len(ticks) < 2:
+            return 0.0
+        span = ticks[-1] - ticks[0]
+        return (len(ticks) - 1) / span if span > 0 else 0.0
+
+    def percentiles(self, stage, quantiles=QUANTILES, last=None):
+        """Latency quantiles over the window, or only its newest `last` samples"""
+        samples = self.samples(stage)
+        if last is not None:
+            samples = samples[-last:] if last > 0 else []
+        samples.sort()
+        if not samples:
+            return {q: None for q in quantiles}
+        last = len(samples) - 1
+        return {q: samples[min(last, int(round(q * last)))] for q in quantiles}
+
+    def mean(self, stage):
+        samples = self.samples(stage)
+        return sum(samples) / len(samples) if samples else None
+
+    # ---------------- Prometheus text format ----------------
+    def render_prometheus(self):
+        lines = [
+            "# HELP pipeline_stage_latency_seconds Latency of each pipeline stage.",
+            "# TYPE pipeline_stage_latency_seconds summary",
+        ]
+        latency_sum, latency_count = self.latency_sum, self.latency_count
+        for stage in STAGES:
+            for q, value in self.percentiles(stage).items():
+                if value is not None:
+                    lines.append(f'pipeline_stage_latency_seconds{{stage="{stage}",quantile="{q}"}} {value:.6f}')
+            lines.append(f'pipeline_stage_latency_seconds_sum{{stage="{stage}"}} {latency_sum[stage]:.6f}')
+            lines.append(f'pipeline_stage_latency_seconds_count{{stage="{stage}"}} {latency_count[stage]}')
+
+        lines += ["# HELP pipeline_fps Frames per second over the last few seconds.",
+                  "# TYPE pipeline_fps gauge"]
+        for stream in STREAMS:
+            lines.append(f'pipeline_fps{{stream="{stream}"}} {self.fps(stream):.2f}')
+
+        for name, value in self.counters.items():
+            lines += [f"# TYPE pipeline_{name}_total counter", f"pipeline_{name}_total {value}"]
+
+        for name, value in _copy(self.gauges, dict).items():
+            lines += [f"# TYPE pipeline_{name} gauge", f"pipeline_{name} {value}"]
+
+        lines += ["# TYPE pipeline_uptime_seconds gauge",
+                  f"pipeline_uptime_seconds {time.monotonic() - self.started:.1f}"]
+        return "\n".join(lines) + "\n"
+
+
+# ---------------- HTTP endpoint ----------------
+class MetricsServer:
+    """Serves /metrics on localhost from a daemon thread"""
+
+    def __init__(self, metrics, host=METRICS_HOST, port=METRICS_PORT):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self.routes = {"/metrics": self._serve_metrics}
+        self.httpd = None
+
+    def add_route(self, path, handler):
+        """handler(query_string) -> (status, content_type, body)"""
+        self.routes[path] = handler
+
+    def _serve_metrics(self, query):
+        return 200, "text/plain; version=0.0.4", self.metrics.render_prometheus()
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path, _, query = self.path.partition("?")
+                route = server.routes.get(path)
+                if route is None:
+                    status, ctype, body = 404, "text/plain", "not found\n"
+                else:
+                    status, ctype, body = route(query)
+                payload = body.encode()
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+
+# ---------------- On-frame HUD ----------------
+class MetricsHUD:
+    """Draws live fps and latency percentiles onto a frame"""
+
+    def __init__(self, metrics, refresh=0.5):
+        self.metrics = metrics
+        self.refresh = refresh
+        self.lines = []
+        self.last_refresh = 0
+
+    def _format(self):
+        m = self.metrics
+        lines = [f"cap {m.fps('capture'):4.1f} fps | disp {m.fps('display'):4.1f} fps | "
+                 f"drop {m.count('frames_dropped')} | level {m.gauges.get('degradation_level', 0)}"]
+        for stage in ("queue", "inference", "postprocess", "overlay", "render", "frame"):
+            p = m.percentiles(stage)
+            if p[0.5] is None:
+                continue
+            lines.append(f"{stage:<11} p50 {p[0.5] * 1000:6.1f}  p95 {p[0.95] * 1000:6.1f}  "
+                         f"p99 {p[0.99] * 1000:6.1f} ms")
+        return lines
+
+    def draw(self, frame):
+        now = time.monotonic()
+        if now - self.last_refresh > self.refresh:
+            self.lines = self._format()
+            self.last_refresh = now
+
+        y = 20
+        for line in self.lines:
+            cv2.putText(frame, line, (10, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 3)
+            cv2.putText(frame, line, (10, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+            y += 20
+        return frame
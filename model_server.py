@@ -0,0 +1,237 @@
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+from collections import namedtuple
+from multiprocessing import resource_tracker, shared_memory
+from multiprocessing.connection import Client, Listener
+
+import numpy as np
+
+from config import ConfigWatcher
+from inference import Detections, LocalModel
+from resources import CorePlan
+
+# ---------------- Defaults ----------------
+if sys.platform == "win32":
+    DEFAULT_ADDRESS = r"\\.\pipe\hand_model_server"
+else:
+    DEFAULT_ADDRESS = "/tmp/hand_model_server.sock"
+MAX_BATCH = 8
+MAX_WAIT = 0.008  # seconds the oldest request may wait for a batch to fill
+STATS_INTERVAL = 60.0
+CLIENT_TIMEOUT = 5.0
+
+Request = namedtuple("Request", ["reply", "req_id", "frame", "conf", "imgsz", "arrived"])
+
+
+def _attach_shm(name):
+    shm = shared_memory.SharedMemory(name=name)
+    if sys.platform != "win32":
+        # The client owns the segment; stop our resource tracker from unlinking it on exit
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+class ModelServer:
+    """One YOLO instance shared by every pipeline on the host.
+
+    Clients put frames in their own shared-memory segment and send a small
+    request over a Unix socket (named pipe on Windows). Requests from all
+    clients are micro-batched: a batch runs when it is full or when the
+    oldest request has waited max_wait seconds.
+    """
+
+    def __init__(self, model_path, address=DEFAULT_ADDRESS, max_batch=MAX_BATCH, max_wait=MAX_WAIT):
+        self.model = LocalModel(model_path)
+        self.address = address
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.requests = queue.Queue()
+        self.stats = {"requests": 0, "batches": 0, "infer_time": 0.0}
+
+    def serve_forever(self):
+        if not self.address.startswith("\\\\") and os.path.exists(self.address):
+            os.unlink(self.address)  # stale socket from a previous run
+        listener = Listener(self.address)
+        print(f"[SERVER] Model {self.model.path} serving on {self.address} "
+              f"(batch <= {self.max_batch}, wait <= {self.max_wait * 1000:.0f} ms)")
+
+        threading.Thread(target=self._batch_loop, daemon=True).start()
+        threading.Thread(target=self._stats_loop, daemon=True).start()
+        try:
+            while True:
+                conn = listener.accept()
+                threading.Thread(target=self._client_loop, args=(conn,), daemon=True).start()
+        finally:
+            listener.close()
+
+    # ---------------- Per-client connection ----------------
+    def _client_loop(self, conn):
+        send_lock = threading.Lock()
+
+        def reply(message):
+            with send_lock:
+                conn.send(message)
+
+        segments = {}
+        try:
+            conn.send(("hello", self.model.names))
+            while True:
+                msg = conn.recv()
+                if msg[0] == "infer":
+                    _, req_id, shm_name, shape, dtype, conf, imgsz = msg
+                    shm = segments.get(shm_name)
+                    if shm is None:
+                        shm = segments[shm_name] = _attach_shm(shm_name)
+                    # Zero-copy view; the client waits for the reply before reusing the segment
+                    frame = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+                    self.requests.put(Request(reply, req_id, frame, conf, imgsz, time.monotonic()))
+                elif msg[0] == "release":
+                    shm = segments.pop(msg[1], None)
+                    if shm is not None:
+                        try:
+                            shm.close()
+                        except BufferError:
+                            pass  # a queued request still references it; unmapped once that is done
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+            for shm in segments.values():
+                try:
+                    shm.close()
+                except BufferError:
+                    pass  # a queued request still references it
+
+    # ---------------- Micro-batching ----------------
+    def _batch_loop(self):
+        while True:
+            batch = [self.requests.get()]
+            deadline = batch[0].arrived + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            by_imgsz = {}
+            for request in batch:
+                by_imgsz.setdefault(request.imgsz, []).append(request)
+            for imgsz, group in by_imgsz.items():
+                self._run(group, imgsz)
+
+    def _run(self, group, imgsz):
+        t0 = time.perf_counter()
+        try:
+            # One pass at the lowest requested threshold, then filter per client
+            results = self.model.predict_batch([r.frame for r in group], min(r.conf for r in group), imgsz)
+        except Exception as e:
+            for request in group:
+                self._send(request, ("error", request.req_id, str(e)))
+            return
+
+        self.stats["requests"] += len(group)
+        self.stats["batches"] += 1
+        self.stats["infer_time"] += time.perf_counter() - t0
+        for request, det in zip(group, results):
+            keep = det.conf >= request.conf
+            self._send(request, ("ok", request.req_id, det.xyxy[keep], det.conf[keep], det.cls[keep]))
+
+    @staticmethod
+    def _send(request, message):
+        try:
+            request.reply(message)
+        except (OSError, ValueError):
+            pass  # client went away
+
+    def _stats_loop(self):
+        while True:
+            time.sleep(STATS_INTERVAL)
+            s = self.stats
+            if s["batches"]:
+                print(f"[SERVER] {s['requests']} frames in {s['batches']} batches "
+                      f"(mean batch {s['requests'] / s['batches']:.2f}, "
+                      f"{1000 * s['infer_time'] / s['requests']:.1f} ms/frame)")
+
+
+class ModelClient:
+    """Drop-in for LocalModel that sends frames to a running ModelServer"""
+
+    def __init__(self, address=DEFAULT_ADDRESS, timeout=CLIENT_TIMEOUT):
+        self.address = address
+        self.timeout = timeout
+        self.conn = Client(address)
+        _, self.names = self.conn.recv()
+        self.shm = None
+        self.req_id = 0
+        self.lock = threading.Lock()
+
+    def _ensure_segment(self, nbytes):
+        if self.shm is not None and self.shm.size >= nbytes:
+            return
+        self._release_segment()
+        self.shm = shared_memory.SharedMemory(create=True, size=nbytes)
+
+    def _release_segment(self):
+        if self.shm is None:
+            return
+        try:
+            self.conn.send(("release", self.shm.name))
+        except (OSError, ValueError):
+            pass  # connection already gone
+        self.shm.close()
+        self.shm.unlink()
+        self.shm = None
+
+    def predict(self, frame, conf, imgsz):
+        frame = np.ascontiguousarray(frame)
+        with self.lock:
+            self._ensure_segment(frame.nbytes)
+            np.ndarray(frame.shape, dtype=frame.dtype, buffer=self.shm.buf)[...] = frame
+
+            self.req_id += 1
+            self.conn.send(("infer", self.req_id, self.shm.name, frame.shape, frame.dtype.str, conf, imgsz))
+            deadline = time.monotonic() + self.timeout
+            while True:
+                if not self.conn.poll(max(0.0, deadline - time.monotonic())):
+                    # The server may still be reading the frame: never write the next one over it
+                    self._release_segment()
+                    raise TimeoutError(f"model server did not answer within {self.timeout}s")
+                status, req_id, *payload = self.conn.recv()
+                if req_id == self.req_id:
+                    break  # older replies belong to requests that already timed out
+            if status != "ok":
+                raise RuntimeError(f"model server error: {payload[0]}")
+            return Detections(*payload)
+
+    def close(self):
+        with self.lock:
+            try:
+                self._release_segment()
+            finally:
+                self.conn.close()
+
+
+if __name__ == "__main__":
+    settings = ConfigWatcher().settings
+    parser = argparse.ArgumentParser(description="Shared YOLO model server for hand detection pipelines")
+    parser.add_argument("--model", default=settings.resolved_model_path())
+    parser.add_argument("--address", default=settings.model_server or DEFAULT_ADDRESS)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT * 1000)
+    args = parser.parse_args()
+
+    # The server is the inference stage for every camera: give it the configured budget
+    core_plan = CorePlan.from_settings(settings)
+    if core_plan:
+        core_plan.apply_process()
+        core_plan.pin("inference")
+        print(f"[SERVER] CPU budget: {core_plan.describe()}")
+
+    ModelServer(args.model, args.address, args.max_batch, args.max_wait_ms / 1000).serve_forever()
@@ -0,0 +1,122 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from urllib.parse import parse_qs
+
+# ---------------- Defaults ----------------
+DIAGNOSTICS_DIR = "diagnostics"
+SAMPLE_INTERVAL = 0.01  # 100 Hz
+DEFAULT_DURATION = 10.0
+MAX_DURATION = 120.0
+TOP_N = 25
+
+
+class SamplingProfiler:
+    """Time-boxed sampling profiler over every Python thread in the process.
+
+    Nothing runs while idle: a sampler thread only exists for the duration of
+    a capture. Output is a folded-stack file (flamegraph.pl / speedscope)
+    plus a top-N summary of the hottest functions.
+    """
+
+    def __init__(self, out_dir=DIAGNOSTICS_DIR, interval=SAMPLE_INTERVAL, top_n=TOP_N):
+        self.out_dir = out_dir
+        self.interval = interval
+        self.top_n = top_n
+        self._lock = threading.Lock()
+        self._thread = None
+        self.last_result = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def capture(self, duration=DEFAULT_DURATION):
+        """Start a capture in the background; returns the output prefix or None if busy"""
+        duration = max(0.5, min(float(duration), MAX_DURATION))
+        with self._lock:
+            if self.running:
+                return None
+            os.makedirs(self.out_dir, exist_ok=True)
+            prefix = os.path.join(self.out_dir, f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+            self._thread = threading.Thread(target=self._run, args=(duration, prefix),
+                                            name="sampling-profiler", daemon=True)
+            self._thread.start()
+        print(f"[PROFILE] Sampling all threads for {duration:.0f}s -> {prefix}.*")
+        return prefix
+
+    # ---------------- Sampling ----------------
+    def _run(self, duration, prefix):
+        own_id = threading.get_ident()
+        stacks = Counter()
+        samples = 0
+        deadline = time.monotonic() + duration
+
+        while time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stacks[self._fold(names.get(thread_id, str(thread_id)), frame)] += 1
+            samples += 1
+            time.sleep(self.interval)
+
+        self.last_result = self._write(prefix, stacks, samples, duration)
+        print(f"[PROFILE] Done: {samples} samples written to {prefix}.folded")
+
+    @staticmethod
+    def _fold(thread_name, frame):
+        labels = []
+        while frame is not None:
+            code = frame.f_code
+            labels.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        labels.append(thread_name)
+        return ";".join(reversed(labels))
+
+    # ---------------- Output ----------------
+    def _write(self, prefix, stacks, samples, duration):
+        folded_path = prefix + ".folded"
+        with open(folded_path, "w", encoding="utf-8") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        self_counts = Counter()
+        total_counts = Counter()
+        for stack, count in stacks.items():
+            # First label is the thread name, not a function
+            frames = stack.split(";")[1:]
+            if not frames:
+                continue
+            self_counts[frames[-1]] += count
+            for label in set(frames):
+                total_counts[label] += count
+
+        total_samples = sum(stacks.values()) or 1
+        summary_path = prefix + "_top.txt"
+        with open(summary_path, "w", encoding="utf-8") as f:
+            f.write(f"Sampling profile: {duration:.1f}s, {samples} sweeps, "
+                    f"{self.interval * 1000:.0f} ms interval, all threads\n\n")
+            f.write(f"Top {self.top_n} by self time\n")
+            for label, count in self_counts.most_common(self.top_n):
+                f.write(f"{100.0 * count / total_samples:6.2f}%  {count:7d}  {label}\n")
+            f.write(f"\nTop {self.top_n} by total time\n")
+            for label, count in total_counts.most_common(self.top_n):
+                f.write(f"{100.0 * count / total_samples:6.2f}%  {count:7d}  {label}\n")
+
+        return folded_path, summary_path
+
+    # ---------------- HTTP route (see metrics.MetricsServer.add_route) ----------------
+    def http_route(self, query):
+        params = parse_qs(query)
+        duration = params.get("seconds", [DEFAULT_DURATION])[0]
+        try:
+            prefix = self.capture(float(duration))
+        except ValueError:
+            return 400, "text/plain", "seconds must be a number\n"
+        if prefix is None:
+            return 409, "text/plain", "profile already running\n"
+        return 202, "text/plain", f"profiling -> {prefix}.folded\n"
@@ -0,0 +1,307 @@
+"""Promotion gate for new weights.
+
+Compares candidate weights with the deployed model on a fixed validation set
+and on recorded clips. Checks overall mAP, hand/glove recall, sensitivity on
+the clips and CPU latency percentiles, and also checks the candidate's mAP
+and overall recall against the best epoch in the original training's
+results.csv. Prints a pass/fail
+report, writes it to diagnostics/, and exits 1 on failure. With --promote,
+the deployed weights are replaced only if every check passes; the old file is
+kept as a backup. Latency is timed on the inference path production runs,
+including the fast path when settings.json enables it. Clip frames are
+streamed, not held in memory; --max-frames caps how many are compared.
+
+    python promote.py runs/retrain/ft_20260101_120000/weights/best.pt --data newdataset/data.yaml --clips clips/
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import shutil
+import sys
+import time
+from datetime import datetime
+
+import cv2
+
+from config import ConfigWatcher
+from fast_path import VERIFY_FRAMES
+from inference import LocalModel
+from resources import CorePlan
+
+# ---------------- Defaults ----------------
+BASELINE_CSV = os.path.join("runs", "detect", "train", "results.csv")
+REPORT_DIR = "diagnostics"
+CLIP_EXTENSIONS = (".mp4", ".avi", ".mkv", ".mov")
+MAX_MAP_DROP = 0.01  # absolute mAP a candidate may lose
+MAX_RECALL_DROP = 0.01  # absolute hand-class recall a candidate may lose
+MAX_MISS_RATE = 0.02  # clip frames where deployed sees a hand and the candidate does not
+LATENCY_BUDGET = 1.10  # candidate p50/p95 may be at most this multiple of deployed
+LATENCY_FRAMES = 200
+WARMUP_FRAMES = 3  # per model before timing; the fast path also needs its VERIFY_FRAMES
+CLIP_STRIDE = 5  # evaluate every Nth clip frame
+
+
+def is_hand(name):
+    name = name.lower()
+    return "hand" in name or "glove" in name
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+
+# ---------------- Accuracy ----------------
+def validate(weights, data, imgsz, device):
+    """mAP and per-class recall on the fixed validation split"""
+    from ultralytics import YOLO
+    model = YOLO(weights)
+    metrics = model.val(data=data, imgsz=imgsz, device=device, split="val", plots=False, verbose=False)
+    box = metrics.box
+    recall = {model.names[int(c)]: float(r) for c, r in zip(box.ap_class_index, box.r)}
+    return {
+        "map50": float(box.map50),
+        "map50_95": float(box.map),
+        "recall": float(box.mr),  # mean over classes, as results.csv records it
+        "hand_recall": {name: r for name, r in recall.items() if is_hand(name)},
+    }
+
+
+def baseline_from_csv(path):
+    """Best epoch of the original training, by Ultralytics' fitness (0.1 mAP50 + 0.9 mAP50-95)"""
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        rows = [{k.strip(): v for k, v in row.items()} for row in csv.DictReader(f)]
+    if not rows:
+        return None
+    best = max(rows, key=lambda r: 0.1 * float(r["metrics/mAP50(B)"]) + 0.9 * float(r["metrics/mAP50-95(B)"]))
+    return {
+        "epoch": int(best["epoch"]),
+        "map50": float(best["metrics/mAP50(B)"]),
+        "map50_95": float(best["metrics/mAP50-95(B)"]),
+        "recall": float(best["metrics/recall(B)"]),
+    }
+
+
+# ---------------- Clips: sensitivity and latency ----------------
+def clip_frames(paths, stride, limit=None):
+    """Every stride-th frame of each clip, one at a time, up to limit frames in total"""
+    count = 0
+    for path in paths:
+        cap = cv2.VideoCapture(path)
+        n = 0
+        try:
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                if n % stride == 0:
+                    yield frame
+                    count += 1
+                    if limit and count >= limit:
+                        return
+                n += 1
+        finally:
+            cap.release()
+
+
+def list_clips(sources):
+    clips = []
+    for source in sources:
+        if os.path.isdir(source):
+            clips.extend(sorted(os.path.join(source, name) for name in os.listdir(source)
+                                if name.lower().endswith(CLIP_EXTENSIONS)))
+        else:
+            clips.append(source)
+    return clips
+
+
+def has_hand(det, names):
+    return any(is_hand(names[int(c)]) for c in det.cls)
+
+
+def compare_on_frames(candidate, deployed, frames, conf, imgsz, latency_frames, warmup=WARMUP_FRAMES):
+    """Hand sensitivity against the deployed model, plus interleaved latency for both.
+
+    frames may be any iterable; only the first `warmup` frames are kept in memory.
+    """
+    deployed_hits = missed = extra = n = 0
+    latency = {"candidate": [], "deployed": []}
+
+    frames = iter(frames)
+    first = list(itertools.islice(frames, warmup))
+    for model in (candidate, deployed):
+        for frame in first:
+            model.predict(frame, conf, imgsz)  # warm up outside the measurement
+
+    for i, frame in enumerate(itertools.chain(first, frames)):
+        n += 1
+        timed = i < latency_frames
+        # Alternate which model goes first so neither gets a warmer cache
+        order = ((candidate, "candidate"), (deployed, "deployed"))
+        hits = {}
+        for model, key in (order if i % 2 == 0 else order[::-1]):
+            t0 = time.perf_counter()
+            det = model.predict(frame, conf, imgsz)
+            if timed:
+                latency[key].append(time.perf_counter() - t0)
+            hits[key] = has_hand(det, model.names)
+        if hits["deployed"]:
+            deployed_hits += 1
+            missed += not hits["candidate"]
+        elif hits["candidate"]:
+            extra += 1
+
+    if not n:
+        return None
+    summary = {
+        "frames": n,
+        "deployed_hand_frames": deployed_hits,
+        "missed_hand_frames": missed,
+        "extra_hand_frames": extra,
+        "miss_rate": missed / deployed_hits if deployed_hits else 0.0,
+    }
+    for key, values in latency.items():
+        values.sort()
+        summary[f"{key}_ms"] = {f"p{int(q * 100)}": round(1000 * percentile(values, q), 2) for q in (0.5, 0.95, 0.99)}
+    return summary
+
+
+# ---------------- Report ----------------
+def check(checks, name, passed, detail):
+    checks.append({"check": name, "pass": bool(passed), "detail": detail})
+
+
+def run_gate(args, settings):
+    report = {
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "candidate": args.candidate,
+        "deployed": args.deployed,
+        "thresholds": {
+            "max_map_drop": args.max_map_drop,
+            "max_recall_drop": args.max_recall_drop,
+            "max_miss_rate": args.max_miss_rate,
+            "latency_budget": args.latency_budget,
+        },
+    }
+    checks = report["checks"] = []
+
+    if args.data:
+        print("[GATE] Validating candidate...")
+        cand = report["candidate_val"] = validate(args.candidate, args.data, args.imgsz, args.device)
+        print("[GATE] Validating deployed model...")
+        dep = report["deployed_val"] = validate(args.deployed, args.data, args.imgsz, args.device)
+        for key in ("map50", "map50_95"):
+            check(checks, f"{key} vs deployed", cand[key] >= dep[key] - args.max_map_drop,
+                  f"{cand[key]:.4f} vs {dep[key]:.4f}")
+        for name, dep_recall in dep["hand_recall"].items():
+            cand_recall = cand["hand_recall"].get(name, 0.0)
+            check(checks, f"recall '{name}' vs deployed", cand_recall >= dep_recall - args.max_recall_drop,
+                  f"{cand_recall:.4f} vs {dep_recall:.4f}")
+
+        baseline = report["baseline"] = baseline_from_csv(args.baseline_csv)
+        if baseline:
+            check(checks, "map50_95 vs results.csv", cand["map50_95"] >= baseline["map50_95"] - args.max_map_drop,
+                  f"{cand['map50_95']:.4f} vs {baseline['map50_95']:.4f} (epoch {baseline['epoch']})")
+            check(checks, "recall vs results.csv", cand["recall"] >= baseline["recall"] - args.max_recall_drop,
+                  f"{cand['recall']:.4f} vs {baseline['recall']:.4f} (epoch {baseline['epoch']})")
+    else:
+        check(checks, "validation set", False, "no --data given; accuracy cannot be checked")
+
+    clips = list_clips(args.clips)
+    clip = None
+    if clips:
+        limit = f", up to {args.max_frames} frames" if args.max_frames else ""
+        print(f"[GATE] Comparing on {len(clips)} clip(s){limit}...")
+        # Same inference path as production, fast path included
+        candidate = LocalModel(args.candidate, fast=settings.fast_path)
+        deployed = LocalModel(args.deployed, fast=settings.fast_path)
+        warmup = WARMUP_FRAMES + (VERIFY_FRAMES if settings.fast_path else 0)
+        clip = compare_on_frames(candidate, deployed, clip_frames(clips, args.stride, args.max_frames),
+                                 settings.confidence, args.imgsz, args.latency_frames, warmup)
+    if clip is None:
+        check(checks, "recorded clips", False, "no clip frames; sensitivity and latency cannot be checked")
+    else:
+        report["clips"] = clip
+        print(f"[GATE] Compared {clip['frames']} frame(s)")
+        check(checks, "clip hand miss rate", clip["miss_rate"] <= args.max_miss_rate,
+              f"{clip['missed_hand_frames']}/{clip['deployed_hand_frames']} missed ({100 * clip['miss_rate']:.1f}%)")
+        for q in ("p50", "p95"):
+            c, d = clip["candidate_ms"][q], clip["deployed_ms"][q]
+            check(checks, f"latency {q}", c <= d * args.latency_budget, f"{c:.1f} ms vs {d:.1f} ms")
+
+    report["pass"] = all(c["pass"] for c in checks)
+    return report
+
+
+def print_report(report):
+    print()
+    for c in report["checks"]:
+        print(f"  [{'PASS' if c['pass'] else 'FAIL'}] {c['check']:<32} {c['detail']}")
+    print(f"\n[GATE] {'PASS' if report['pass'] else 'FAIL'}: {report['candidate']}")
+
+
+def promote(candidate, deployed):
+    """Replace the deployed weights, keeping the old file next to it"""
+    backup = f"{deployed}.{datetime.now().strftime('%Y%m%d_%H%M%S')}.bak"
+    if os.path.exists(deployed):
+        shutil.copy2(deployed, backup)
+        print(f"[GATE] Previous weights kept as {backup}")
+    tmp = deployed + ".tmp"
+    shutil.copy2(candidate, tmp)
+    os.replace(tmp, deployed)
+    print(f"[GATE] Promoted {candidate} -> {deployed}")
+
+
+def main():
+    settings = ConfigWatcher().settings
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("candidate", help="candidate .pt weights")
+    parser.add_argument("--deployed", default=settings.model_path)
+    parser.add_argument("--data", help="data.yaml with the fixed validation split")
+    parser.add_argument("--clips", nargs="*", default=["clips"], help="recorded clips or directories of clips")
+    parser.add_argument("--baseline-csv", default=BASELINE_CSV)
+    parser.add_argument("--imgsz", type=int, default=settings.imgsz)
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--stride", type=int, default=CLIP_STRIDE)
+    parser.add_argument("--max-frames", type=int, default=0, help="clip frames to compare (0: all)")
+    parser.add_argument("--latency-frames", type=int, default=LATENCY_FRAMES)
+    parser.add_argument("--max-map-drop", type=float, default=MAX_MAP_DROP)
+    parser.add_argument("--max-recall-drop", type=float, default=MAX_RECALL_DROP)
+    parser.add_argument("--max-miss-rate", type=float, default=MAX_MISS_RATE)
+    parser.add_argument("--latency-budget", type=float, default=LATENCY_BUDGET)
+    parser.add_argument("--promote", action="store_true", help="replace the deployed weights if the gate passes")
+    args = parser.parse_args()
+    if args.stride < 1 or args.latency_frames < 1:
+        parser.error("--stride and --latency-frames must be >= 1")
+    if args.max_frames < 0:
+        parser.error("--max-frames must be >= 0")
+
+    # Measure latency under the same thread pools as production
+    core_plan = CorePlan.from_settings(settings)
+    if core_plan:
+        core_plan.apply_process()
+        core_plan.pin("inference")
+        print(f"[GATE] CPU budget: {core_plan.describe()}")
+
+    report = run_gate(args, settings)
+    print_report(report)
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    path = os.path.join(REPORT_DIR, f"promotion_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"[GATE] Report written to {path}")
+
+    if args.promote:
+        if report["pass"]:
+            promote(args.candidate, args.deployed)
+        else:
+            print("[GATE] Not promoted")
+    sys.exit(0 if report["pass"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import os
+import sys
+
+import cv2
+
+# Stages that get their own core set when pinning is enabled
+STAGES = ("inference", "capture")
+
+
+# ---------------- Process usage ----------------
+def cpu_seconds():
+    """User + system CPU time of this process"""
+    t = os.times()
+    return t.user + t.system
+
+
+def rss_bytes():
+    """Current resident set size of this process, or None where it cannot be read"""
+    if sys.platform.startswith("linux"):
+        try:
+            with open("/proc/self/statm", "r") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, IndexError):
+            return None
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class Counters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + \
+                       [(name, ctypes.c_size_t) for name in (
+                           "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage",
+                           "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")]
+
+        counters = Counters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return counters.WorkingSetSize
+        return None
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Peak rather than current, but the best available without /proc (macOS reports bytes)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class CorePlan:
+    """Thread pools sized from one per-camera core budget.
+
+    PyTorch, OpenCV and the FFmpeg decoder each default to one thread per
+    core, so several cameras on a 4-8 core PC oversubscribe badly. The plan
+    gives the decoder one thread (two above 4 cores), OpenCV's own pool one
+    thread, and the rest of the budget to torch intra-op threads. With
+    pin_start set, the inference and capture stages also get disjoint core
+    sets from [pin_start, pin_start + budget).
+
+    Thread pools are fixed once torch starts, so changes need a restart.
+    """
+
+    def __init__(self, budget, pin_start=None):
+        self.budget = max(1, int(budget))
+        self.decode_threads = 1 if self.budget <= 4 else 2
+        self.cv2_threads = 1
+        self.inference_threads = max(1, self.budget - self.decode_threads)
+        self.interop_threads = 1
+
+        self.cores = {}
+        if pin_start is not None:
+            available = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") \
+                else list(range(os.cpu_count() or 1))
+            cores = [c for c in range(pin_start, pin_start + self.budget) if c in available] or available
+            split = min(self.inference_threads, max(1, len(cores) - 1))
+            self.cores = {"inference": cores[:split], "capture": cores[split:] or cores[-1:]}
+
+    @classmethod
+    def from_settings(cls, settings):
+        """None when no budget is configured (library defaults)"""
+        if not settings.cpu_budget:
+            return None
+        return cls(settings.cpu_budget, settings.cpu_pin_start)
+
+    def describe(self):
+        text = (f"{self.budget} cores: torch {self.inference_threads} intra / {self.interop_threads} inter-op, "
+                f"decoder {self.decode_threads}, OpenCV {self.cv2_threads}")
+        if self.cores:
+            text += ", pinned " + ", ".join(f"{stage}={cores}" for stage, cores in self.cores.items())
+        return text
+
+    # ---------------- Process-wide limits ----------------
+    def apply_process(self, load_torch=True):
+        """Set thread pool sizes; call before the model is loaded or any capture is opened"""
+        for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+            os.environ[var] = str(self.inference_threads)
+
+        # Read by OpenCV's FFmpeg backend when a capture is opened
+        options = [opt for opt in os.environ.get("OPENCV_FFMPEG_CAPTURE_OPTIONS", "").split("|")
+                   if opt and not opt.startswith("threads;")]
+        options.append(f"threads;{self.decode_threads}")
+        os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = "|".join(options)
+
+        cv2.setNumThreads(self.cv2_threads)
+
+        if load_torch or "torch" in sys.modules:
+            try:
+                import torch
+            except ImportError:
+                return
+            torch.set_num_threads(self.inference_threads)
+            try:
+                torch.set_num_interop_threads(self.interop_threads)
+            except RuntimeError:
+                pass  # inter-op pool already started; only settable once per process
+
+    # ---------------- Per-thread affinity ----------------
+    def pin(self, stage):
+        """Pin the calling thread to its stage's cores (Linux); threads it starts inherit the mask"""
+        cores = self.cores.get(stage)
+        if not cores:
+            return False
+        if not hasattr(os, "sched_setaffinity"):
+            print("[WARNING] CPU pinning is not supported on this platform")
+            self.cores = {}
+            return False
+        os.sched_setaffinity(0, cores)
+        return True
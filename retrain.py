@@ -0,0 +1,339 @@
+"""Fine-tune the production weights on newly added images.
+
+Starts from the current best.pt instead of yolov8n.pt and trains on the new
+images (e.g. reviewed hard_examples/ days) plus a replay sample of the
+original training set, so the model does not forget what it already knows.
+
+Decoded, resized images live in a memory-mapped cache keyed by file hash:
+an image is decoded once, ever, and every later epoch or retrain reads it
+straight from the cache.
+
+    python retrain.py --data newdataset/data.yaml --new hard_examples
+    python retrain.py --resume
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+import yaml
+from ultralytics import YOLO
+from ultralytics.data.dataset import YOLODataset
+from ultralytics.models.yolo.detect import DetectionTrainer
+
+from config import ConfigWatcher
+
+# ---------------- Defaults ----------------
+CACHE_DIR = "train_cache"
+PROJECT = os.path.join("runs", "retrain")
+STATE_FILE = os.path.join(CACHE_DIR, "retrain_state.json")
+IMG_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+SAVE_EVERY = 200  # cache index flush interval while preparing
+
+
+def write_json(path, data):
+    """Atomic replace so an interrupted run never leaves a half-written file"""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def read_json(path, default):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+# ---------------- Preprocessed image cache ----------------
+class ImageCache:
+    """Resized training images in one append-only file, memory-mapped for reads.
+
+    Entries are keyed by SHA-1 of the image file, so renamed or copied images
+    hit the cache and edited ones miss it. files.json remembers size/mtime ->
+    hash so unchanged files are not even re-hashed. Images are resized the
+    way Ultralytics does it (long side to imgsz), so one cache serves one
+    imgsz. prepare() fills the cache in the main process; dataloader workers
+    only read.
+    """
+
+    def __init__(self, root, imgsz):
+        self.dir = os.path.join(root, f"imgsz{imgsz}_area")  # suffix: earlier caches were shrunk bilinearly
+        self.imgsz = imgsz
+        os.makedirs(self.dir, exist_ok=True)
+        self.data_path = os.path.join(self.dir, "images.bin")
+        self.index_path = os.path.join(self.dir, "index.json")
+        self.files_path = os.path.join(self.dir, "files.json")
+
+        self.entries = read_json(self.index_path, {})  # sha1 -> [offset, h, w, h0, w0]
+        self.files = read_json(self.files_path, {})  # abspath -> [size, mtime_ns, sha1]
+        self._mm = None
+
+    def __getstate__(self):
+        # Dataloader workers reopen the map themselves
+        state = dict(self.__dict__)
+        state["_mm"] = None
+        return state
+
+    def digest(self, path):
+        """(sha1, file bytes or None); bytes are only read when the file changed"""
+        st = os.stat(path)
+        known = self.files.get(path)
+        if known and known[0] == st.st_size and known[1] == st.st_mtime_ns:
+            return known[2], None
+        with open(path, "rb") as f:
+            data = f.read()
+        sha1 = hashlib.sha1(data).hexdigest()
+        self.files[path] = [st.st_size, st.st_mtime_ns, sha1]
+        return sha1, data
+
+    def resize(self, im):
+        h0, w0 = im.shape[:2]
+        r = self.imgsz / max(h0, w0)
+        if r != 1:
+            w, h = min(math.ceil(w0 * r), self.imgsz), min(math.ceil(h0 * r), self.imgsz)
+            # As Ultralytics loads without augmentation: area averaging when shrinking
+            im = cv2.resize(im, (w, h), interpolation=cv2.INTER_AREA if r < 1 else cv2.INTER_LINEAR)
+        return im, (h0, w0)
+
+    def prepare(self, paths):
+        """Hash every image and decode only those not cached; returns (cached, decoded)"""
+        cached = decoded = 0
+        offset = os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
+        with open(self.data_path, "ab") as out:
+            for n, path in enumerate(paths, 1):
+                sha1, data = self.digest(path)
+                if sha1 in self.entries:
+                    cached += 1
+                    continue
+                if data is None:
+                    with open(path, "rb") as f:
+                        data = f.read()
+                im = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+                if im is None:
+                    print(f"[WARNING] Could not decode {path}, left to the trainer")
+                    continue
+                im, (h0, w0) = self.resize(im)
+                out.write(np.ascontiguousarray(im).tobytes())
+                self.entries[sha1] = [offset, im.shape[0], im.shape[1], h0, w0]
+                offset += im.nbytes
+                decoded += 1
+                if decoded % SAVE_EVERY == 0:
+                    out.flush()
+                    self.save()
+                    print(f"[CACHE] {n}/{len(paths)} images checked, {decoded} decoded")
+        self.save()
+        self._mm = None
+        return cached, decoded
+
+    def save(self):
+        write_json(self.index_path, self.entries)
+        write_json(self.files_path, self.files)
+
+    def get(self, path):
+        """(image, (h0, w0), (h, w)) from the cache, or None"""
+        known = self.files.get(path)
+        entry = self.entries.get(known[2]) if known else None
+        if entry is None:
+            return None
+        if self._mm is None:
+            self._mm = np.memmap(self.data_path, dtype=np.uint8, mode="r")
+        offset, h, w, h0, w0 = entry
+        # Copy out of the map: augmentations may write into the array
+        im = np.array(self._mm[offset:offset + h * w * 3]).reshape(h, w, 3)
+        return im, (h0, w0), (h, w)
+
+
+class CachedYOLODataset(YOLODataset):
+    """YOLODataset whose load_image reads from an ImageCache instead of decoding"""
+
+    image_cache = None
+
+    def load_image(self, i, rect_mode=True):
+        hit = self.image_cache.get(os.path.abspath(self.im_files[i])) if self.image_cache else None
+        if hit is None:
+            return super().load_image(i, rect_mode)
+        im, hw0, hw = hit
+        if not rect_mode and hw != (self.imgsz, self.imgsz):
+            im = cv2.resize(im, (self.imgsz, self.imgsz), interpolation=cv2.INTER_LINEAR)
+            hw = im.shape[:2]
+
+        # Same mosaic buffer bookkeeping as BaseDataset.load_image
+        if self.augment:
+            self.ims[i], self.im_hw0[i], self.im_hw[i] = im, hw0, hw
+            self.buffer.append(i)
+            if 1 < len(self.buffer) >= self.max_buffer_length:
+                j = self.buffer.pop(0)
+                if self.cache != "ram":
+                    self.ims[j], self.im_hw0[j], self.im_hw[j] = None, None, None
+        return im, hw0, hw
+
+
+class CachedTrainer(DetectionTrainer):
+    image_cache = None  # set before training
+
+    def build_dataset(self, img_path, mode="train", batch=None):
+        dataset = super().build_dataset(img_path, mode, batch)
+        if isinstance(dataset, YOLODataset) and CachedTrainer.image_cache is not None:
+            dataset.__class__ = CachedYOLODataset
+            dataset.image_cache = CachedTrainer.image_cache
+        return dataset
+
+
+# ---------------- Dataset assembly ----------------
+def list_images(source, root=None):
+    """Image paths from a directory (recursive), a .txt list, or a list of either"""
+    if isinstance(source, list):
+        return [p for s in source for p in list_images(s, root)]
+    if root and not os.path.isabs(source):
+        source = os.path.join(root, source)
+    if source.endswith(".txt"):
+        base = os.path.dirname(source)
+        with open(source, "r", encoding="utf-8") as f:
+            return [os.path.abspath(os.path.join(base, line.strip())) for line in f if line.strip()]
+    images = []
+    for dirpath, _, filenames in os.walk(source):
+        images.extend(os.path.abspath(os.path.join(dirpath, name)) for name in filenames
+                      if name.lower().endswith(IMG_EXTENSIONS))
+    return sorted(images)
+
+
+def load_data_yaml(path):
+    with open(path, "r", encoding="utf-8") as f:
+        data = yaml.safe_load(f)
+    root = data.get("path") or os.path.dirname(os.path.abspath(path))
+    if not os.path.isabs(root):
+        root = os.path.join(os.path.dirname(os.path.abspath(path)), root)
+    return data, root
+
+
+def build_run(args, cache, state):
+    """Write the train list and data yaml for a fine-tune; returns (data yaml, new hashes)"""
+    data, root = load_data_yaml(args.data)
+    trained = set(state.get("trained", []))
+
+    new_images, new_hashes = [], []
+    for path in list_images(args.new):
+        sha1, _ = cache.digest(path)
+        if sha1 not in trained:
+            new_images.append(path)
+            new_hashes.append(sha1)
+    if not new_images:
+        return None, []
+
+    new_set = set(new_images)
+    base_images = [p for p in list_images(data["train"], root) if p not in new_set]
+    k = min(len(base_images), int(len(new_images) * args.replay))
+    replay = random.Random(args.seed).sample(base_images, k)
+    train_images = new_images + replay
+    print(f"[INFO] {len(new_images)} new image(s) + {len(replay)} replayed from the original training set")
+
+    cached, decoded = cache.prepare(train_images)
+    print(f"[CACHE] {cached} cached, {decoded} decoded")
+
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    os.makedirs(PROJECT, exist_ok=True)
+    list_path = os.path.abspath(os.path.join(PROJECT, f"train_{stamp}.txt"))
+    with open(list_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(train_images) + "\n")
+
+    val = data.get("val")
+    run_data = {
+        "path": root,
+        "train": list_path,
+        "val": [os.path.join(root, v) for v in val] if isinstance(val, list) else os.path.join(root, val),
+        "names": data["names"],
+    }
+    if "nc" in data:
+        run_data["nc"] = data["nc"]
+    yaml_path = os.path.join(PROJECT, f"data_{stamp}.yaml")
+    with open(yaml_path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(run_data, f, sort_keys=False)
+    return yaml_path, new_hashes
+
+
+def main():
+    settings = ConfigWatcher().settings
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", help="data.yaml of the original dataset (names, val split, replay pool)")
+    parser.add_argument("--new", nargs="+", default=["hard_examples"], help="directories or .txt lists of new images")
+    parser.add_argument("--weights", default=settings.model_path, help="weights to fine-tune (default: production)")
+    parser.add_argument("--replay", type=float, default=1.0, help="replayed old images per new image")
+    parser.add_argument("--epochs", type=int, default=15)
+    parser.add_argument("--imgsz", type=int, default=settings.imgsz)
+    parser.add_argument("--batch", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--freeze", type=int, default=10, help="backbone layers kept frozen")
+    parser.add_argument("--lr0", type=float, default=0.002)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--resume", action="store_true", help="resume the last interrupted fine-tune")
+    args = parser.parse_args()
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    state = read_json(STATE_FILE, {"trained": [], "pending": None})
+    cache = ImageCache(CACHE_DIR, args.imgsz)
+    CachedTrainer.image_cache = cache
+    start = time.monotonic()
+
+    if args.resume:
+        pending = state.get("pending")
+        last = os.path.join(pending["run"], "weights", "last.pt") if pending else None
+        if not last or not os.path.exists(last):
+            parser.error("no interrupted fine-tune to resume")
+        print(f"[INFO] Resuming {pending['run']}")
+        trainer_run = YOLO(last).train(resume=True, trainer=CachedTrainer)
+        new_hashes = pending["hashes"]
+    else:
+        if not args.data:
+            parser.error("--data is required unless --resume is given")
+        yaml_path, new_hashes = build_run(args, cache, state)
+        if yaml_path is None:
+            print("[INFO] No new images since the last fine-tune; nothing to do")
+            return
+        name = "ft_" + datetime.now().strftime("%Y%m%d_%H%M%S")
+        state["pending"] = {"run": os.path.join(PROJECT, name), "hashes": new_hashes}
+        write_json(STATE_FILE, state)
+
+        print(f"[INFO] Fine-tuning {args.weights} for {args.epochs} epoch(s)")
+        trainer_run = YOLO(args.weights).train(
+            trainer=CachedTrainer,
+            data=yaml_path,
+            epochs=args.epochs,
+            imgsz=args.imgsz,
+            batch=args.batch,
+            workers=args.workers,
+            device=args.device,
+            freeze=args.freeze,
+            lr0=args.lr0,
+            warmup_epochs=0.5,
+            cache=False,  # ImageCache replaces Ultralytics' own cache
+            seed=args.seed,
+            project=PROJECT,
+            name=name,
+            exist_ok=True,
+        )
+
+    # Only now do the new images count as trained
+    state["trained"] = sorted(set(state.get("trained", [])) | set(new_hashes))
+    run_dir = state["pending"]["run"]
+    state["pending"] = None
+    write_json(STATE_FILE, state)
+
+    best = os.path.join(run_dir, "weights", "best.pt")
+    print(f"[INFO] Fine-tune finished in {(time.monotonic() - start) / 60:.1f} min: {best}")
+    if trainer_run is not None and hasattr(trainer_run, "box"):
+        print(f"[INFO] val mAP50 {trainer_run.box.map50:.3f}, mAP50-95 {trainer_run.box.map:.3f}")
+    print(f"[INFO] Production weights are unchanged; gate them with: python promote.py {best} --data {args.data or '<data.yaml>'}")
+
+
+if __name__ == "__main__":
+    main()
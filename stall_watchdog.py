@@ -0,0 +1,119 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+# ---------------- Defaults ----------------
+CHECK_INTERVAL = 0.1  # seconds
+EVENT_LOG = os.path.join("diagnostics", "watchdog_events.jsonl")
+
+
+class StallWatchdog:
+    """Fires a fail-safe when capture or detection stops making progress.
+
+    The pipeline only stores monotonic heartbeat timestamps; a separate
+    thread compares their age against the deadlines, so a hung capture
+    thread or a blocked Tk loop is still caught.
+    Fires once per stall, calls on_recover (if given) when progress
+    resumes, and re-arms.
+    """
+
+    def __init__(self, on_stall, is_armed, frame_deadline, inference_deadline,
+                 metrics=None, interval=CHECK_INTERVAL, event_log=EVENT_LOG, on_recover=None):
+        self.on_stall = on_stall
+        self.on_recover = on_recover
+        self.is_armed = is_armed
+        self.frame_deadline = frame_deadline
+        self.inference_deadline = inference_deadline
+        self.metrics = metrics
+        self.interval = interval
+        self.event_log = event_log
+
+        self.last_frame = None
+        self.last_inference = None
+        self.inference_t0 = None
+        self.tripped = False
+        self._armed = False
+        self._running = False
+
+    # ---------------- Heartbeats (hot path) ----------------
+    def frame_arrived(self):
+        self.last_frame = time.monotonic()
+
+    def inference_started(self):
+        self.inference_t0 = time.monotonic()
+
+    def inference_finished(self):
+        self.last_inference = time.monotonic()
+        self.inference_t0 = None
+
+    # ---------------- Checking ----------------
+    def start(self):
+        self._running = True
+        threading.Thread(target=self._run, name="stall-watchdog", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._running = False
+
+    def _run(self):
+        while self._running:
+            self.check()
+            time.sleep(self.interval)
+
+    def check(self):
+        now = time.monotonic()
+        if not self.is_armed():
+            self._armed = False
+            self.tripped = False
+            return None
+        if not self._armed:
+            # Deadlines count from arming, not from whenever the last frame happened to arrive
+            self._armed = True
+            self.last_frame = self.last_inference = now
+
+        reasons = []
+        frame_age = now - self.last_frame
+        if self.frame_deadline and frame_age > self.frame_deadline:
+            reasons.append(f"no camera frame for {frame_age:.2f}s (deadline {self.frame_deadline:.2f}s)")
+        inference_age = now - self.last_inference
+        if self.inference_deadline and inference_age > self.inference_deadline:
+            t0 = self.inference_t0
+            detail = f", current inference running {now - t0:.2f}s" if t0 is not None else ""
+            reasons.append(f"no detection result for {inference_age:.2f}s "
+                           f"(deadline {self.inference_deadline:.2f}s{detail})")
+
+        if reasons and not self.tripped:
+            self.tripped = True
+            reason = "; ".join(reasons)
+            self._log(reason, frame_age, inference_age)
+            self.on_stall(f"watchdog: {reason}")
+        elif not reasons and self.tripped:
+            self.tripped = False
+            print("[WATCHDOG] Pipeline recovered")
+            if self.on_recover:
+                self.on_recover()
+        return reasons
+
+    def _log(self, reason, frame_age, inference_age):
+        event = {
+            "time": datetime.now().isoformat(timespec="milliseconds"),
+            "reason": reason,
+            "frame_age_s": round(frame_age, 3),
+            "inference_age_s": round(inference_age, 3),
+        }
+        if self.metrics is not None:
+            event["stages_ms"] = {
+                stage: {f"p{int(q * 100)}": round(v * 1000, 1) for q, v in self.metrics.percentiles(stage).items()
+                        if v is not None}
+                for stage in ("capture", "inference", "postprocess", "render", "frame")
+            }
+            event["counters"] = dict(self.metrics.counters)
+        print(f"[WATCHDOG] STALL - {reason} | {json.dumps(event.get('stages_ms', {}))}")
+        try:
+            os.makedirs(os.path.dirname(self.event_log) or ".", exist_ok=True)
+            with open(self.event_log, "a", encoding="utf-8") as f:
+                f.write(json.dumps(event) + "\n")
+        except OSError as e:
+            print(f"[WATCHDOG] Could not write {self.event_log}: {e}")
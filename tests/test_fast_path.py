@@ -0,0 +1,162 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+
+from fast_path import IOU, MAX_DET, MAX_WH, Letterbox, FastPath, nms
+
+# (frame h, w, imgsz, auto) covering resize and no-resize, stride padding and square padding
+GEOMETRIES = [(720, 1280, 640, True), (720, 1280, 640, False), (480, 640, 640, True),
+              (1080, 1920, 320, True), (481, 853, 480, False), (640, 640, 640, True)]
+
+
+# ---------------- Reference: Ultralytics LetterBox, preprocess and scale_boxes ----------------
+def reference_input(frame, imgsz, stride, auto):
+    h0, w0 = frame.shape[:2]
+    r = min(imgsz / h0, imgsz / w0)
+    new_unpad = int(round(w0 * r)), int(round(h0 * r))
+    dw, dh = imgsz - new_unpad[0], imgsz - new_unpad[1]
+    if auto:
+        dw, dh = np.mod(dw, stride), np.mod(dh, stride)
+    dw, dh = dw / 2, dh / 2
+    img = frame
+    if (w0, h0) != new_unpad:
+        img = cv2.resize(frame, new_unpad, interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+    left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+    img = cv2.copyMakeBorder(img, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+    x = np.ascontiguousarray(img[..., ::-1].transpose(2, 0, 1)[None]).astype(np.float32)
+    return x / np.float32(255)
+
+
+def reference_scale_boxes(boxes, input_shape, frame_shape):
+    boxes = boxes.copy()
+    gain = min(input_shape[0] / frame_shape[0], input_shape[1] / frame_shape[1])
+    pad_x = round((input_shape[1] - frame_shape[1] * gain) / 2 - 0.1)
+    pad_y = round((input_shape[0] - frame_shape[0] * gain) / 2 - 0.1)
+    boxes[:, [0, 2]] -= pad_x
+    boxes[:, [1, 3]] -= pad_y
+    boxes /= np.float32(gain)
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, frame_shape[1])
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, frame_shape[0])
+    return boxes
+
+
+def reference_nms(boxes, scores, iou):
+    """Plain greedy NMS, one box pair at a time"""
+    keep = []
+    for i in sorted(range(len(scores)), key=lambda i: -scores[i]):
+        suppressed = False
+        for j in keep:
+            w = max(np.float32(0), min(boxes[i, 2], boxes[j, 2]) - max(boxes[i, 0], boxes[j, 0]))
+            h = max(np.float32(0), min(boxes[i, 3], boxes[j, 3]) - max(boxes[i, 1], boxes[j, 1]))
+            inter = w * h
+            area_i = (boxes[i, 2] - boxes[i, 0]) * (boxes[i, 3] - boxes[i, 1])
+            area_j = (boxes[j, 2] - boxes[j, 0]) * (boxes[j, 3] - boxes[j, 1])
+            if inter / (area_i + area_j - inter) > iou:
+                suppressed = True
+                break
+        if not suppressed:
+            keep.append(i)
+    return keep
+
+
+def random_boxes(rng, n, extent=600):
+    xy = rng.uniform(0, extent, (n, 2)).astype(np.float32)
+    wh = rng.uniform(10, 120, (n, 2)).astype(np.float32)
+    return np.concatenate((xy, xy + wh), axis=1), rng.uniform(0.05, 1.0, n).astype(np.float32)
+
+
+# ---------------- Letterbox ----------------
+def test_letterbox_fill_matches_reference():
+    rng = np.random.default_rng(0)
+    for h, w, imgsz, auto in GEOMETRIES:
+        frame = rng.integers(0, 255, (h, w, 3), dtype=np.uint8)
+        letterbox = Letterbox(h, w, imgsz, 32, auto)
+        expected = reference_input(frame, imgsz, 32, auto)
+        assert letterbox.fill(frame).shape == expected.shape, (h, w, imgsz, auto)
+        assert np.array_equal(letterbox.fill(frame), expected), (h, w, imgsz, auto)
+
+
+def test_letterbox_reuses_its_buffers():
+    rng = np.random.default_rng(1)
+    letterbox = Letterbox(720, 1280, 640, 32, True)
+    first = letterbox.fill(rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8))
+    frame = rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8)
+    assert letterbox.fill(frame) is first
+    assert np.array_equal(first, reference_input(frame, 640, 32, True))
+
+
+def test_scale_boxes_matches_reference():
+    rng = np.random.default_rng(2)
+    for h, w, imgsz, auto in GEOMETRIES:
+        letterbox = Letterbox(h, w, imgsz, 32, auto)
+        boxes, _ = random_boxes(rng, 50, extent=imgsz)
+        expected = reference_scale_boxes(boxes, (letterbox.h, letterbox.w), (h, w))
+        assert np.array_equal(letterbox.scale_boxes(boxes.copy()), expected), (h, w, imgsz, auto)
+
+
+# ---------------- NMS and decode ----------------
+def test_nms_fixed_boxes():
+    boxes = np.array([[0, 0, 100, 100], [5, 5, 105, 105], [200, 200, 300, 300], [0, 0, 100, 60]], np.float32)
+    scores = np.array([0.9, 0.8, 0.7, 0.95], np.float32)
+    # Box 1 overlaps box 0 with IoU ~0.82 (> 0.7); box 0 overlaps box 3 with IoU 0.6 (kept)
+    assert nms(boxes, scores, IOU).tolist() == [3, 0, 2]
+
+
+def test_nms_matches_reference():
+    rng = np.random.default_rng(3)
+    for _ in range(20):
+        boxes, scores = random_boxes(rng, 80)
+        assert nms(boxes, scores, IOU).tolist() == reference_nms(boxes, scores, IOU)
+
+
+def decoder():
+    return FastPath.__new__(FastPath)  # decode needs no model
+
+
+def raw_output(boxes_xywh, class_scores):
+    """(4 + nc, N) raw YOLOv8 output from per-box xywh and class scores"""
+    return np.concatenate((np.asarray(boxes_xywh, np.float32).T, np.asarray(class_scores, np.float32).T))
+
+
+def test_decode_keeps_every_class_and_is_class_aware():
+    letterbox = Letterbox(640, 640, 640, 32, True)  # identity scaling
+    pred = raw_output(
+        [[100, 100, 50, 50], [102, 100, 50, 50], [100, 100, 50, 50], [400, 400, 20, 20]],
+        [[0.9, 0.0, 0.0], [0.8, 0.0, 0.0], [0.0, 0.0, 0.85], [0.0, 0.3, 0.0]],
+    )
+    det = decoder().decode(pred, letterbox, 0.5)
+    # Box 1 is suppressed by box 0 (same class); box 2 overlaps box 0 but is another class; box 3 is below conf
+    assert det.cls.tolist() == [0.0, 2.0]
+    assert det.conf.tolist() == [np.float32(0.9), np.float32(0.85)]
+    assert det.xyxy.tolist() == [[75, 75, 125, 125], [75, 75, 125, 125]]
+
+
+def test_decode_matches_reference_pipeline():
+    rng = np.random.default_rng(4)
+    h, w, imgsz = 720, 1280, 640
+    letterbox = Letterbox(h, w, imgsz, 32, True)
+    n, nc, conf = 400, 3, 0.25
+    xy = rng.uniform(0, imgsz, (n, 2))
+    wh = rng.uniform(8, 100, (n, 2))
+    pred = raw_output(np.concatenate((xy, wh), axis=1), rng.uniform(0, 1, (n, nc)) ** 3)
+
+    scores = pred[4:]
+    best, cls = scores.max(0), scores.argmax(0)
+    keep = best > conf
+    xywh = pred[:4, keep].T
+    half = xywh[:, 2:] / np.float32(2)
+    boxes = np.concatenate((xywh[:, :2] - half, xywh[:, :2] + half), axis=1)
+    best, cls = best[keep], cls[keep].astype(np.float32)
+    order = reference_nms(boxes + cls[:, None] * np.float32(MAX_WH), best, IOU)[:MAX_DET]
+    expected_boxes = reference_scale_boxes(boxes[order], (letterbox.h, letterbox.w), (h, w))
+
+    det = decoder().decode(pred, letterbox, conf)
+    assert np.array_equal(det.xyxy, expected_boxes)
+    assert np.array_equal(det.conf, best[order])
+    assert np.array_equal(det.cls, cls[order])
+    assert len(set(det.cls.tolist())) > 1
@@ -0,0 +1,63 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from zone_state import ZoneStateMachine
+
+FRAME = 0.1  # seconds between detections
+
+
+def feed(machine, pattern, seconds, start=0.0):
+    """Feed pattern (a list of raw zones) cyclically for `seconds`; returns the end time"""
+    t = start
+    i = 0
+    while t < start + seconds:
+        machine.update(pattern[i % len(pattern)], t)
+        t += FRAME
+        i += 1
+    return t
+
+
+def test_red_alternating_with_misses_actuates():
+    changes = []
+    machine = ZoneStateMachine(enter_dwell=0.3, exit_dwell=1.0, on_change=lambda old, new: changes.append(new))
+    feed(machine, ["red", None], 5.0)
+    assert machine.state == "red"
+    assert machine.actuations == 1
+    assert changes == ["red"]
+
+
+def test_red_alternating_with_yellow_actuates():
+    machine = ZoneStateMachine(enter_dwell=0.3, exit_dwell=1.0)
+    feed(machine, ["red", "yellow"], 2.0)
+    assert machine.state == "red"
+
+
+def test_single_red_blip_is_filtered():
+    machine = ZoneStateMachine(enter_dwell=0.3, exit_dwell=0.5)
+    t = feed(machine, ["red"], 0.1)
+    feed(machine, [None], 2.0, start=t)
+    assert machine.state is None
+    assert machine.actuations == 0
+    assert machine.filtered == 1
+
+
+def test_flicker_does_not_relax_state():
+    machine = ZoneStateMachine(enter_dwell=0.0, exit_dwell=0.5, latch_red=False)
+    t = feed(machine, ["yellow", None, None], 3.0)
+    assert machine.state == "yellow"
+    feed(machine, [None], 1.0, start=t)
+    assert machine.state is None
+
+
+def test_latched_red_needs_new_dwell_after_reset():
+    machine = ZoneStateMachine(enter_dwell=0.3, exit_dwell=1.0)
+    t = feed(machine, ["red", None], 1.0)
+    assert machine.latched
+    assert machine.reset()
+    machine.update("red", t)
+    assert machine.state is None
+    feed(machine, ["red", None], 1.0, start=t + FRAME)
+    assert machine.state == "red"
+    assert machine.actuations == 2
@@ -0,0 +1,99 @@
+import time
+
+# Higher rank wins when several hands are in different zones
+RANK = {None: 0, "yellow": 1, "red": 2}
+
+
+class ZoneStateMachine:
+    """Debounced zone state for one camera.
+
+    A raw episode at or above a severity starts on the first detection that
+    reaches it and survives misses (or lower zones) of up to exit_dwell, so
+    a hand YOLO finds in red only on every other frame still counts as one
+    continuous red episode. The state escalates once an episode has lasted
+    enter_dwell, and relaxes only after exit_dwell with nothing at its
+    level. With latch_red, red stays latched until reset() is called.
+
+    on_change(old, new) is called on every confirmed transition.
+    """
+
+    def __init__(self, enter_dwell, exit_dwell, latch_red=True, on_change=None):
+        self.enter_dwell = enter_dwell
+        self.exit_dwell = exit_dwell
+        self.latch_red = latch_red
+        self.on_change = on_change
+
+        self.state = None
+        self.entry_since = {}  # severity -> start of the current raw episode at or above it
+        self.last_seen = {}  # severity -> last detection at or above it
+        self.below_since = None  # first detection below the current state, while it lasts
+        self.red_confirmed = False  # current raw red episode reached the state
+
+        # Tuning counters
+        self.actuations = 0
+        self.suppressed = 0  # raw red episodes starting while already red/latched
+        self.filtered = 0  # raw red episodes that ended before enter_dwell
+
+    @property
+    def latched(self):
+        return self.latch_red and self.state == "red"
+
+    def update(self, raw, now=None):
+        """Feed the raw zone of one detection; returns the debounced state"""
+        now = time.monotonic() if now is None else now
+        rank = RANK[raw]
+
+        for severity in ("yellow", "red"):
+            if rank >= RANK[severity]:
+                if severity not in self.entry_since:
+                    self.entry_since[severity] = now
+                    if severity == "red" and self.state == "red":
+                        self.suppressed += 1
+                self.last_seen[severity] = now
+            elif severity in self.entry_since and now - self.last_seen[severity] > self.exit_dwell:
+                # Out for longer than a flicker: the episode is over
+                del self.entry_since[severity]
+                if severity == "red":
+                    if not self.red_confirmed and self.state != "red":
+                        self.filtered += 1
+                    self.red_confirmed = False
+
+        if rank >= RANK[self.state]:
+            self.below_since = None
+        elif self.below_since is None:
+            self.below_since = now
+
+        if self.latched:
+            return self.state
+        # Escalate only on a detection at that severity; misses merely keep the episode alive
+        for severity in ("red", "yellow"):
+            since = self.entry_since.get(severity)
+            if RANK[severity] > RANK[self.state] and rank >= RANK[severity] and now - since >= self.enter_dwell:
+                self._set(severity)
+                return self.state
+        if self.below_since is not None and now - self.below_since >= self.exit_dwell:
+            # Relax to the most severe episode still alive below the current state
+            alive = [s for s in self.entry_since if RANK[s] < RANK[self.state]]
+            self._set(max(alive, key=RANK.get) if alive else None)
+            self.below_since = None
+        return self.state
+
+    def _set(self, new):
+        old, self.state = self.state, new
+        if new == "red":
+            self.actuations += 1
+            self.red_confirmed = True
+        if self.on_change:
+            self.on_change(old, new)
+
+    def reset(self):
+        """Clear a latched red; returns True if there was anything to clear"""
+        if self.state is None:
+            return False
+        # Start a fresh episode: a hand still in red must dwell again before re-actuating
+        self.entry_since = {}
+        self.last_seen = {}
+        self.below_since = None
+        self.red_confirmed = False
+        self._set(None)
+        return True
@@ -0,0 +1,98 @@
+import cv2
+import numpy as np
+
+# Checked in this order: a point inside both a red and a yellow zone is red
+SEVERITIES = ("red", "yellow")
+
+
+def point_in_poly_fast(pt, polygon):
+    return cv2.pointPolygonTest(polygon, pt, False) >= 0
+
+
+class ZoneSet:
+    """Zone polygons for one camera in normalized (0..1) frame coordinates.
+
+    Any number of zones per severity and any vertex count (>= 3). Pixel
+    polygons are compiled once per resolution and cached, so each pipeline
+    stage can work at its own frame size.
+    """
+
+    def __init__(self, zones=None):
+        self.zones = []  # [(severity, ((x, y), ...)), ...]
+        self._compiled = {}
+        for zone in zones or []:
+            self.add(zone["severity"], zone["points"])
+
+    # ---------------- Editing ----------------
+    def add(self, severity, points):
+        if severity not in SEVERITIES:
+            raise ValueError(f"unknown zone severity '{severity}'")
+        if len(points) < 3:
+            raise ValueError("a zone needs at least 3 points")
+        points = tuple((min(max(float(x), 0.0), 1.0), min(max(float(y), 0.0), 1.0)) for x, y in points)
+        self.zones.append((severity, points))
+        self._compiled.clear()
+
+    def add_pixels(self, severity, points, width, height):
+        """Add a zone drawn in pixel coordinates of a width x height frame"""
+        self.add(severity, [(x / width, y / height) for x, y in points])
+
+    def clear(self):
+        self.zones = []
+        self._compiled.clear()
+
+    def is_empty(self):
+        return not self.zones
+
+    def to_list(self):
+        return [{"severity": severity, "points": [list(p) for p in points]} for severity, points in self.zones]
+
+    # ---------------- Compilation ----------------
+    def compile(self, width, height):
+        """CompiledZones for a width x height frame (cached per resolution)"""
+        key = (int(width), int(height))
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            compiled = CompiledZones(self.zones, *key)
+            self._compiled[key] = compiled
+        return compiled
+
+
+class CompiledZones:
+    """Pixel-space int32 polygons for one resolution, ready for OpenCV"""
+
+    def __init__(self, zones, width, height):
+        self.width = width
+        self.height = height
+        scale = np.array([width, height], dtype=np.float64)
+        self.polygons = {severity: [] for severity in SEVERITIES}
+        for severity, points in zones:
+            pixels = np.round(np.array(points, dtype=np.float64) * scale).astype(np.int32)
+            self.polygons[severity].append(pixels)
+
+    def __bool__(self):
+        return any(self.polygons.values())
+
+    def bounds(self, margin=0.1):
+        """(x0, y0, x1, y1) around every zone, grown by margin x its size; None without zones"""
+        polygons = [p for severity in SEVERITIES for p in self.polygons[severity]]
+        if not polygons:
+            return None
+        points = np.concatenate(polygons)
+        x0, y0 = (int(v) for v in points.min(axis=0))
+        x1, y1 = (int(v) for v in points.max(axis=0))
+        dx, dy = int((x1 - x0) * margin), int((y1 - y0) * margin)
+        return (max(0, x0 - dx), max(0, y0 - dy), min(self.width, x1 + dx), min(self.height, y1 + dy))
+
+    def zone_of(self, pt, grow=None):
+        """Most severe zone containing pt; grow={severity: px} widens that severity's polygons"""
+        pt = (int(pt[0]), int(pt[1]))
+        for severity in SEVERITIES:
+            margin = grow.get(severity, 0) if grow else 0
+            for polygon in self.polygons[severity]:
+                if margin:
+                    if cv2.pointPolygonTest(polygon, pt, True) >= -margin:
+                        return severity
+                elif point_in_poly_fast(pt, polygon):
+                    return severity
+        return None